@@ -1,30 +1,78 @@
 import subprocess
 import time
+PROCESS_START = time.perf_counter()     ###用于统计首个窗口/首个采样的耗时
 import threading
 from tkinter import *
 from tkinter import ttk
 import queue
+import collections
+import statistics
 import re
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+###matplotlib只在界面模式创建图表时导入(plot_canvas), 不导入pyplot, 无界面模式不加载matplotlib
 import math
+import sys
+import argparse
+import json
+import base64
+import html
+import concurrent.futures
+import os
 import logging
+import logging.handlers
+import http.server
 
 log_queue = queue.Queue()
+touch_event_queue = queue.Queue()   ###触摸线程上报的(时间戳ns, 手势编号)
+gesture_queue = queue.Queue()       ###触摸线程上报的已结束手势(手势, 主机接收时间)
+logcat_event_queue = queue.Queue()  ###logcat线程解析出的GC/丢帧/ANR事件
+
+gui_enabled = True      ###无界面模式下日志不进入Text组件队列
+first_window_benchmark = False
 
 def log_message(message):
     """将日志消息插入到 Text 组件中"""
-    log_queue.put(message)  # 将日志消息放入队列中
+    if gui_enabled:
+        log_queue.put(message)  # 将日志消息放入队列中
     logging.info(message)
 
+LOG_MAX_LINES = 5000        ###日志框最多保留的行数, 超出后批量删除最早的行
+LOG_TRIM_LINES = 1000       ###每次删除的行数, 避免每次插入都触发删除
+LOG_BATCH_LIMIT = 2000      ###每次最多插入的消息数, 积压超过时丢弃较早的消息
+
+def drain_log_queue():
+    """一次取出队列中所有待显示的消息, 积压过多时只保留最新的部分并合并连续重复的消息"""
+    messages = []
+    while not log_queue.empty():
+        messages.append(log_queue.get_nowait())
+    dropped = len(messages) - LOG_BATCH_LIMIT
+    if dropped > 0:
+        messages = [f"... {dropped} log messages dropped ..."] + messages[-LOG_BATCH_LIMIT:]
+    merged = []
+    repeat = 0
+    for message in messages:
+        if merged and message == merged[-1]:
+            repeat += 1
+            continue
+        if repeat:
+            merged[-1] += f" (x{repeat + 1})"
+            repeat = 0
+        merged.append(message)
+    if repeat:
+        merged[-1] += f" (x{repeat + 1})"
+    return merged
+
 def process_log_queue():
     """处理日志队列中的消息，并插入到 Text 组件中"""
-    while not log_queue.empty():
-        message = log_queue.get_nowait()
-        if log_text:
-            log_text.insert(END, message + '\n')
+    messages = drain_log_queue()
+    if messages and log_text:
+        ###仅当滚动条在底部时自动滚动, 方便回看历史日志
+        at_bottom = log_text.yview()[1] >= 1.0
+        log_text.insert(END, '\n'.join(messages) + '\n')
+        line_count = int(log_text.index('end-1c').split('.')[0])
+        if line_count > LOG_MAX_LINES:
+            log_text.delete('1.0', f'{line_count - LOG_MAX_LINES + LOG_TRIM_LINES}.0')
+        if at_bottom:
             log_text.yview(END)
     root.after(100, process_log_queue)  # 每100ms检查一次队列
 
@@ -69,23 +117,216 @@ def get_app_startup_time(name):
     WaitTime
     AMS启动Activity的总耗时,如果关心系统启动应用耗时,参考WaitTime
     '''
-    totalTime = None
-    waitTime = None
-    for line in result.stdout.splitlines():
-        if "TotalTime" in line or "WaitTime" in line:
-            parts = line.split()
-            if "TotalTime" in line and len(parts) > 1:
-                totalTime = parts[1]
-            else:
-                waitTime = parts[1]
-        if totalTime and waitTime:
-            log_message(f"Application total startup time: TotalTime is {totalTime} ms, WaitTime is {waitTime} ms")
-            break
+    startup_times = parse_am_start_times(result.stdout)
+    if "TotalTime" in startup_times and "WaitTime" in startup_times:
+        log_message(f"Application total startup time: TotalTime is {startup_times['TotalTime']} ms, WaitTime is {startup_times['WaitTime']} ms")
+
+    return startup_times
+
+def parse_am_start_times(output):
+    """解析am start -W输出中的ThisTime/TotalTime/WaitTime(ms)"""
+    startup_times = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) > 1 and parts[0].rstrip(":") in ("ThisTime", "TotalTime", "WaitTime"):
+            startup_times[parts[0].rstrip(":")] = int(parts[1])
+    return startup_times
+
+###logcat: "Displayed com.xx/.MainActivity: +1s234ms" / "Fully drawn com.xx/.MainActivity: +2s10ms"
+###Android 14起为 "Displayed com.xx/.MainActivity for user 0: +1s234ms"
+DISPLAYED_PATTERN = re.compile(r'(Displayed|Fully drawn) (\S+?)(?: for user \d+)?: \+(?:(\d+)s)?(\d+)ms')
+STARTUP_MODES = ("cold", "warm", "hot")
+###95%置信区间的t分布双侧临界值, 自由度1~30, 超过30按正态分布1.96
+T_VALUES_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+               2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+               2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+def parse_displayed_times(output, package_name):
+    """解析logcat中该应用的Displayed/Fully drawn耗时(ms), 取最后一次"""
+    displayed_times = {}
+    for match in DISPLAYED_PATTERN.finditer(output):
+        if match.group(2).startswith(package_name):
+            displayed_times[match.group(1)] = int(match.group(3) or 0) * 1000 + int(match.group(4))
+    return displayed_times
+
+def prepare_startup(name, mode, drop_caches=False):
+    """按启动模式准备应用状态: cold杀进程(可选清理页缓存), warm退出Activity保留进程, hot退到后台"""
+    package_name = name.split("/")[0]
+    if mode == "cold":
+        subprocess.run(["adb", "shell", f"am force-stop {package_name}"], capture_output=True, text=True)
+        if drop_caches:
+            ###需要root权限, 清理页缓存后代码和资源需要重新从存储读取
+            subprocess.run(["adb", "shell", "sync; echo 3 > /proc/sys/vm/drop_caches"], capture_output=True, text=True)
+    elif mode == "warm":
+        subprocess.run(["adb", "shell", "input keyevent KEYCODE_BACK"], capture_output=True, text=True)
+    else:
+        subprocess.run(["adb", "shell", "input keyevent KEYCODE_HOME"], capture_output=True, text=True)
+    time.sleep(1)
 
-    return None
+def get_device_time():
+    """设备当前时间(epoch秒), 读取失败时返回None"""
+    result = subprocess.run(["adb", "shell", "date +%s.%N"], capture_output=True, text=True)
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        return None
+
+def run_startup_once(name, mode, drop_caches=False):
+    """执行一次启动并返回 {ThisTime, TotalTime, WaitTime, Displayed, Fully drawn}"""
+    prepare_startup(name, mode, drop_caches)
+    ###只读取本次启动之后的logcat, 不清空设备日志缓冲区(焦点/logcat监控线程和用户仍需要这些日志)
+    start_time = get_device_time()
+    result = subprocess.run(["adb", "shell", f"am start -W {name}"], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    startup_times = parse_am_start_times(result.stdout)
+    ###Fully drawn需要应用调用reportFullyDrawn, 稍等再读取logcat
+    time.sleep(1)
+    since = ["-t", f"{start_time:.3f}"] if start_time else ["-d"]
+    logcat = subprocess.run(["adb", "logcat"] + since + ["-s", "ActivityTaskManager:I", "ActivityManager:I"], capture_output=True, text=True)
+    startup_times.update(parse_displayed_times(logcat.stdout, name.split("/")[0]))
+    return startup_times
+
+def summarize_samples(values):
+    """计算样本的均值/中位数/标准差/95%置信区间"""
+    count = len(values)
+    mean = statistics.mean(values)
+    stdev = statistics.stdev(values) if count > 1 else 0.0
+    t_value = T_VALUES_95[count - 2] if 1 < count <= len(T_VALUES_95) + 1 else 1.96
+    margin = t_value * stdev / math.sqrt(count) if count > 1 else 0.0
+    return {"n": count, "mean": mean, "median": statistics.median(values), "stdev": stdev,
+            "ci_low": mean - margin, "ci_high": mean + margin, "min": min(values), "max": max(values)}
+
+def benchmark_app_startup(name, mode="cold", iterations=10, drop_caches=False):
+    """重复启动N次, 输出各项启动耗时的统计结果"""
+    log_message(f"Startup benchmark: {name}, mode {mode}, {iterations} iterations{', drop caches' if drop_caches and mode == 'cold' else ''}")
+    if mode != "cold":
+        ###warm/hot需要进程已存在, 先预热启动一次
+        subprocess.run(["adb", "shell", f"am start -W {name}"], capture_output=True, text=True)
+    samples = {}
+    for iteration in range(iterations):
+        startup_times = run_startup_once(name, mode, drop_caches)
+        if not startup_times:
+            log_message(f"Startup #{iteration + 1} failed")
+            continue
+        log_message(f"Startup #{iteration + 1}: " + ", ".join(f"{key} {value} ms" for key, value in startup_times.items()))
+        for key, value in startup_times.items():
+            samples.setdefault(key, []).append(value)
+
+    results = {key: summarize_samples(values) for key, values in samples.items()}
+    for key, summary in results.items():
+        log_message(f"{mode} {key}: n={summary['n']}, mean {summary['mean']:.1f} ms, median {summary['median']:.1f} ms, "
+                    f"stddev {summary['stdev']:.1f} ms, 95% CI [{summary['ci_low']:.1f}, {summary['ci_high']:.1f}] ms, "
+                    f"min {summary['min']} ms, max {summary['max']} ms")
+    return results
+
+STARTUP_CAPTURE_INTERVAL = 0.02       ###设备端采样间隔20ms
+STARTUP_CAPTURE_MAX_SAMPLES = 1500      ###最多采样1500次(约30s), 防止am start不返回时一直采样
+CLOCK_TICKS = 100                       ###/proc/<pid>/stat中utime/stime的单位(USER_HZ)
+
+def build_startup_capture_script(name, interval=STARTUP_CAPTURE_INTERVAL):
+    """生成设备端采样脚本: 后台执行am start -W, 进程出现后循环读取/proc直到首帧显示(am start返回)"""
+    package_name = name.split("/")[0]
+    sample = "echo \"@ $(date +%s.%N)\"; cat /proc/$PID/io /proc/$PID/stat /proc/$PID/statm 2>/dev/null"
+    return (
+        f"am start -W {name} > /dev/null 2>&1 & AM=$!; "
+        f"PID=''; N=0; "
+        f"while [ -z \"$PID\" ] && [ $N -lt {STARTUP_CAPTURE_MAX_SAMPLES * 10} ]; do set -- $(pidof {package_name}); PID=$1; N=$((N+1)); done; "
+        f"N=0; "
+        f"while kill -0 $AM 2>/dev/null && [ $N -lt {STARTUP_CAPTURE_MAX_SAMPLES} ]; do {sample}; sleep {interval}; N=$((N+1)); done; "
+        f"{sample}"
+    )
+
+def parse_startup_capture(output):
+    """解析设备端采样输出, 返回 [{time, read_bytes, write_bytes, rchar, wchar, cpu_ticks, rss_kb}]"""
+    samples = []
+    sample = None
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("@ "):
+            sample = {"time": float(line[2:])}
+            samples.append(sample)
+        elif sample is None or not line:
+            continue
+        elif ": " in line:
+            key, value = line.split(": ", 1)
+            sample[key.strip()] = int(value.strip())
+        elif ")" in line:
+            ###stat: 进程名可能包含空格, 从最后一个')'之后开始按字段取utime(14)和stime(15)
+            fields = line[line.rindex(")") + 2:].split()
+            sample["cpu_ticks"] = int(fields[11]) + int(fields[12])
+        else:
+            fields = line.split()
+            if len(fields) >= 2:
+                sample["rss_kb"] = int(fields[1]) * 4
+    return [sample for sample in samples if "cpu_ticks" in sample and "read_bytes" in sample]
+
+def startup_capture_rates(samples):
+    """由相邻样本的差值计算每个采样间隔的IO速率(kB/s)和CPU使用率(%)"""
+    rates = []
+    for prev, current in zip(samples, samples[1:]):
+        interval_time = current["time"] - prev["time"]
+        if interval_time <= 0:
+            continue
+        rates.append({
+            "time": current["time"] - samples[0]["time"],
+            "read_kb_s": (current["read_bytes"] - prev["read_bytes"]) / interval_time / 1024,
+            "write_kb_s": (current["write_bytes"] - prev["write_bytes"]) / interval_time / 1024,
+            "cpu": (current["cpu_ticks"] - prev["cpu_ticks"]) / CLOCK_TICKS / interval_time * 100,
+            "rss_kb": current.get("rss_kb", 0),
+        })
+    return rates
+
+def capture_app_startup(name, interval=STARTUP_CAPTURE_INTERVAL):
+    """冷启动过程高频采样: 从进程创建到首帧显示, 采样结果写入日志目录下的csv"""
+    global startup_capture
+    package_name = name.split("/")[0]
+    subprocess.run(["adb", "shell", f"am force-stop {package_name}"], capture_output=True, text=True)
+    time.sleep(1)
+    log_message(f"Startup capture: {name}, interval {interval * 1000:.0f} ms")
+    result = subprocess.run(["adb", "shell", build_startup_capture_script(name, interval)], capture_output=True, text=True)
+    samples = parse_startup_capture(result.stdout)
+    if len(samples) < 2:
+        log_message("Startup capture failed: no samples (is adb root enabled?)")
+        return None
+    startup_capture = startup_capture_rates(samples)
+    duration = samples[-1]["time"] - samples[0]["time"]
+    log_message(f"Startup capture: {len(samples)} samples in {duration * 1000:.0f} ms (avg interval {duration / (len(samples) - 1) * 1000:.1f} ms), "
+                f"read {(samples[-1]['read_bytes'] - samples[0]['read_bytes']) / 1024:.1f} kB, "
+                f"write {(samples[-1]['write_bytes'] - samples[0]['write_bytes']) / 1024:.1f} kB, "
+                f"peak read {max(rate['read_kb_s'] for rate in startup_capture):.1f} kB/s, "
+                f"peak CPU {max(rate['cpu'] for rate in startup_capture):.1f}%, RSS {samples[-1].get('rss_kb', 0) / 1024:.1f} MB")
+    path = os.path.join(LOG_DIR, f"{current_time}_startup_{package_name}_{time.strftime('%H_%M_%S', time.localtime())}.csv")
+    with open(path, "w", encoding="utf-8") as csv_file:
+        csv_file.write("time_s,read_kb_s,write_kb_s,cpu_percent,rss_kb\n")
+        for rate in startup_capture:
+            csv_file.write(f"{rate['time']:.4f},{rate['read_kb_s']:.2f},{rate['write_kb_s']:.2f},{rate['cpu']:.1f},{rate['rss_kb']}\n")
+    log_message(f"Startup capture saved to {path}")
+    return startup_capture
+
+def start_startup_capture_thread(name):
+    """启动冷启动采样线程, 避免阻塞界面"""
+    if not name:
+        log_message("Please select an activity")
+        return
+    capture_thread = threading.Thread(target=capture_app_startup, name="startup_capture_Thread", args=(name,))
+    capture_thread.daemon = True
+    capture_thread.start()
+
+def start_startup_benchmark_thread(name, mode, iterations, drop_caches):
+    """启动基准测试线程, 避免阻塞界面"""
+    if not name:
+        log_message("Please select an activity")
+        return
+    benchmark_thread = threading.Thread(target=benchmark_app_startup, name="startup_Thread", args=(name, mode, int(iterations), drop_caches))
+    benchmark_thread.daemon = True
+    benchmark_thread.start()
 
 def plot_canvas(root):
     global fps_plot, io_plot, cpu_plot, gpu_plot, canvas
+    ###只导入Figure和TkAgg画布, 不经过pyplot加载GUI后端
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
     f = Figure(figsize=(6, 3), dpi=100)#figsize定义图像大小，dpi定义像素
 
     # 在创建子图fps_plot变量
@@ -128,14 +369,34 @@ def plot_canvas(root):
     return canvas
 
 def update_fps():
-    global fps_x, fps_y, fps_plot, fps_counter
+    global fps_x, fps_y, fps_plot, fps_counter, fps_algo_y, fps_logcat_marks
     fps_plot.clear()
     fps_x.append(fps_x[-1] + 1)
     fps_y.append(fps)
     if len(fps_x) > 30:
         fps_x.pop(0)
         fps_y.pop(0)
-    fps_plot.plot(fps_x, fps_y)
+    fps_plot.plot(fps_x, fps_y, label=fps_algorithm)
+    ###其他FPS算法在同一张图上对比显示
+    for name in FPS_ALGORITHMS:
+        if name == fps_algorithm:
+            continue
+        algo_y = fps_algo_y.setdefault(name, [0] * (len(fps_x) - 1))
+        algo_y.append(fps_results.get(name, 0))
+        del algo_y[:-len(fps_x)]
+        fps_plot.plot(fps_x, algo_y, linestyle='--', linewidth=0.8, label=name)
+    ###本tick有GC停顿/Choreographer丢帧/ANR时在FPS曲线上标记
+    fps_logcat_marks.append((logcat_tick["gc_pause_ms"], logcat_tick["skipped_frames"], logcat_tick["anr"]))
+    del fps_logcat_marks[:-len(fps_x)]
+    for x, y, (gc_pause, skipped, anr) in zip(fps_x[-len(fps_logcat_marks):], fps_y[-len(fps_logcat_marks):], fps_logcat_marks):
+        if anr:
+            fps_plot.annotate("ANR", (x, y), color='red', fontsize=8)
+        elif skipped:
+            fps_plot.plot(x, y, marker='v', color='tab:orange')
+        elif gc_pause >= LOGCAT_EVENT_MIN_GC_MS:
+            fps_plot.plot(x, y, marker='x', color='tab:purple')
+    if len(FPS_ALGORITHMS) > 1:
+        fps_plot.legend(loc='lower left', fontsize=7)
     if max(fps_x) < 30:
         fps_plot.set_xlim(0, 30)
     fps_plot.set_ylim(0, 70)
@@ -204,6 +465,30 @@ def update_io_stats():
     io_plot.text(io_x[-1] - 1,io_yW[-1] + label_position,f'wb {write_bytes_sec:.2f} kB/s',fontdict={'fontsize':11})
     io_plot.text(0.02, 0.97, io_counter, transform=io_plot.transAxes,
                   ha='left', va='top', fontsize=8)
+    ###块设备: 最忙设备的利用率/await/队列深度, 对照FPS下降
+    disk_name, disk_busiest = busiest_disk(disk_rates)
+    io_plot.text(0.98, 0.97, f"{disk_name or 'disk'} util {disk_busiest['util']:.0f}%  await {disk_busiest['await_ms']:.1f} ms  queue {disk_busiest['queue']:.2f}",
+                 transform=io_plot.transAxes, ha='right', va='top', fontsize=8,
+                 color='red' if disk_busiest['util'] > DISK_BUSY_UTIL else 'black')
+    io_plot.text(0.98, 0.80, f"page faults {format_fault_rates(fault_rates)}", transform=io_plot.transAxes, ha='right', va='top', fontsize=8,
+                 color='red' if fault_rates['majflt_s'] > MAJOR_FAULT_ALERT else 'black')
+
+
+def update_io_top_table():
+    """刷新全系统IO排行表, 被监控进程高亮显示"""
+    io_top_tree.delete(*io_top_tree.get_children())
+    if not system_io_enabled or not system_io:
+        return
+    for item in system_io.top:
+        io_top_tree.insert("", END, values=(item["pid"], item["name"], f"{item['read_kb_s']:.0f}", f"{item['write_kb_s']:.0f}"),
+                           tags=("monitored",) if item["pid"] == str(pid) else ())
+
+
+def update_fault_table():
+    """刷新线程级缺页排行表"""
+    fault_tree.delete(*fault_tree.get_children())
+    for item in thread_fault_rates:
+        fault_tree.insert("", END, values=(item["tid"], item["name"], f"{item['minflt_s']:.0f}", f"{item['majflt_s']:.1f}"))
 
 
 def update_cpu_stats():
@@ -263,6 +548,313 @@ def update_gpu_stats():
     gpu_plot.text(0.02, 0.97, gpu_counter, transform=gpu_plot.transAxes,
                   ha='left', va='top', fontsize=8)
 
+###多分辨率汇总: (名称, 桶宽s, 最多保留的桶数), 1s保留30分钟, 10s保留6小时, 1min保留48小时, 10min保留7天
+ROLLUP_LEVELS = [("1s", 1, 1800), ("10s", 10, 2160), ("1min", 60, 2880), ("10min", 600, 1008)]
+
+class MetricRollup:
+    """单个指标的多分辨率汇总, 每个样本O(1)增量更新各级的min/max/mean/count/last, 内存与运行时长无关"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open_buckets = {}      ###{级别: [起始时间, min, max, sum, count, last]}
+        self.buckets = {name: collections.deque(maxlen=size) for name, _, size in ROLLUP_LEVELS}
+
+    def add(self, timestamp, value):
+        with self.lock:
+            for name, width, _ in ROLLUP_LEVELS:
+                start = timestamp - timestamp % width
+                bucket = self.open_buckets.get(name)
+                if bucket and bucket[0] != start:
+                    self.buckets[name].append(tuple(bucket))
+                    bucket = None
+                if bucket is None:
+                    self.open_buckets[name] = [start, value, value, value, 1, value]
+                else:
+                    bucket[1] = min(bucket[1], value)
+                    bucket[2] = max(bucket[2], value)
+                    bucket[3] += value
+                    bucket[4] += 1
+                    bucket[5] = value
+
+    def get(self, level, count=None):
+        """返回某一级别最近count个桶(含未结束的桶), 每个桶为 {start, min, max, mean, count, last}"""
+        with self.lock:
+            buckets = list(self.buckets[level])
+            if level in self.open_buckets:
+                buckets.append(tuple(self.open_buckets[level]))
+        if count:
+            buckets = buckets[-count:]
+        return [{"start": start, "min": low, "max": high, "mean": total / number, "count": number, "last": last}
+                for start, low, high, total, number, last in buckets]
+
+def record_rollups(timestamp, values):
+    """每个tick将各指标样本加入多分辨率汇总, values为 {指标名: 数值}"""
+    for name, value in values.items():
+        if value is None:
+            continue
+        metric_rollups.setdefault(name, MetricRollup()).add(timestamp, float(value))
+
+def draw_rollup_plot(plot, names, title, level):
+    """用汇总数据重绘子图: 均值折线 + min/max阴影, 显示最近30个桶"""
+    plot.clear()
+    for name in names:
+        if name not in metric_rollups:
+            continue
+        buckets = metric_rollups[name].get(level, 30)
+        x = range(len(buckets))
+        plot.plot(x, [bucket["mean"] for bucket in buckets], label=name)
+        plot.fill_between(x, [bucket["min"] for bucket in buckets], [bucket["max"] for bucket in buckets], alpha=0.2)
+    plot.set_xlim(0, 30)
+    plot.set_title(f'{title} ({level})')
+    if len(names) > 1:
+        plot.legend(loc='upper left', fontsize=7)
+
+class ThresholdDetector:
+    """阈值+迟滞检测: 连续count个样本越过trigger时报警, 回到clear以内才解除, 避免在阈值附近反复报警"""
+
+    def __init__(self, metric, trigger, clear, below=False, count=3):
+        self.metric = metric
+        self.trigger = trigger
+        self.clear = clear
+        self.below = below
+        self.count = count
+        self.hits = 0
+        self.active = False
+
+    def update(self, value):
+        crossed = value < self.trigger if self.below else value > self.trigger
+        cleared = value >= self.clear if self.below else value <= self.clear
+        if not self.active:
+            self.hits = self.hits + 1 if crossed else 0
+            if self.hits >= self.count:
+                self.active = True
+                return f"{self.metric} {'below' if self.below else 'above'} {self.trigger} ({value:.1f})"
+        elif cleared:
+            self.active = False
+            self.hits = 0
+            return f"{self.metric} recovered ({value:.1f})"
+        return None
+
+class CusumDetector:
+    """EWMA基线 + CUSUM变点检测: 每个样本O(1), 残差按EWMA标准差归一化, 累积偏移超过h时报警并重建基线"""
+
+    def __init__(self, metric, direction="up", k=0.5, h=8.0, alpha=0.05, warmup=20, min_std=1.0, cooldown=120):
+        self.metric = metric
+        self.direction = direction
+        self.k = k
+        self.h = h
+        self.alpha = alpha
+        self.warmup = warmup
+        self.min_std = min_std
+        self.cooldown = cooldown
+        self.quiet = 0
+        self.samples = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.cusum = 0.0
+
+    def update(self, value):
+        self.samples += 1
+        self.quiet = max(0, self.quiet - 1)
+        if self.samples == 1:
+            self.mean = value
+            return None
+        std = max(math.sqrt(self.variance), self.min_std)
+        z = (value - self.mean) / std
+        if self.samples > self.warmup:
+            drift = z if self.direction == "up" else -z
+            self.cusum = max(0.0, self.cusum + drift - self.k)
+        if self.cusum > self.h:
+            baseline = self.mean
+            ###报警后以当前值重新建立基线, cooldown个样本内持续变化不重复报警
+            self.samples = 1
+            self.mean = value
+            self.variance = 0.0
+            self.cusum = 0.0
+            if self.quiet:
+                return None
+            self.quiet = self.cooldown
+            return f"{self.metric} shifted {self.direction} from {baseline:.1f} to {value:.1f}"
+        ###只有未偏移时才更新基线, 避免基线被异常值拖走
+        if self.cusum == 0.0 or self.samples <= self.warmup:
+            delta = value - self.mean
+            self.mean += self.alpha * delta
+            self.variance = (1 - self.alpha) * (self.variance + self.alpha * delta * delta)
+        return None
+
+def create_anomaly_detectors():
+    """默认检测器: FPS骤降/卡顿率过高用阈值迟滞, PSS持续上涨/IO/CPU突增用CUSUM"""
+    return [
+        ThresholdDetector("fps", trigger=30, clear=40, below=True),
+        ThresholdDetector("jank", trigger=20, clear=10),
+        CusumDetector("fps", direction="down", min_std=2.0),
+        CusumDetector("pss_kb", direction="up", min_std=256.0, alpha=0.02),
+        CusumDetector("read_kb_s", direction="up", min_std=50.0),
+        CusumDetector("write_kb_s", direction="up", min_std=50.0),
+        CusumDetector("cpu", direction="up", min_std=5.0),
+        CusumDetector("disk_await_ms", direction="up", min_std=2.0),
+        CusumDetector("majflt_s", direction="up", min_std=5.0),
+        CusumDetector("main_runq_ms_s", direction="up", min_std=5.0),
+        CusumDetector("render_runq_ms_s", direction="up", min_std=5.0),
+    ]
+
+def detect_anomalies(timestamp, sample):
+    """每个tick把样本送入各检测器, 检测到异常时写日志并记录到会话, 附带当时所有指标"""
+    events = []
+    for detector in anomaly_detectors:
+        value = sample.get(detector.metric)
+        if value is None:
+            continue
+        message = detector.update(float(value))
+        if message:
+            event = {"type": "anomaly", "time": timestamp, "metric": detector.metric, "message": message, "context": sample}
+            events.append(event)
+            context = ", ".join(f"{name} {value:.1f}" for name, value in sample.items())
+            log_message(f"[ANOMALY] {message} | {context}")
+            record_session(event)
+    return events
+
+LEAK_WINDOWS = [600, 3600, 6 * 3600]    ###泄漏趋势的回归窗口(秒), 可通过--leak-windows修改
+LEAK_MIN_SAMPLES = 30
+LEAK_CONFIDENCE = 0.95                  ###斜率大于0的置信度超过95%且斜率超过最小值时判定为持续增长
+LEAK_CLIP_SIGMA = 3.0                   ###偏离当前拟合超过3倍残差标准差的样本截断后再参与回归(GC等瞬时波动)
+###{指标名: (显示名, 单位, 每小时最小增长)}
+LEAK_METRICS = {
+    "pss_kb": ("PSS", "kB", 1024),
+    "java_heap_kb": ("Java heap", "kB", 512),
+    "native_heap_kb": ("Native heap", "kB", 512),
+    "views": ("Views", "", 20),
+    "activities": ("Activities", "", 0.5),
+}
+
+def format_window(seconds):
+    return f"{seconds // 3600}h" if seconds % 3600 == 0 else f"{seconds // 60}m"
+
+class LeakTrend:
+    """时间窗口内的稳健滑动线性回归: 维护t/y的累加和, 新样本加入、过期样本减去, 每个样本O(1);
+    偏离当前拟合过远的样本先截断, 累加和按窗口长度周期性重算并平移时间原点, 多天运行不损失精度"""
+
+    def __init__(self, metric, window, min_slope, min_samples=LEAK_MIN_SAMPLES, confidence=LEAK_CONFIDENCE, clip=LEAK_CLIP_SIGMA):
+        self.metric = metric
+        self.window = window / 3600     ###时间单位为小时, 斜率单位为每小时
+        self.min_slope = min_slope
+        self.min_samples = min_samples
+        self.confidence = confidence
+        self.clip = clip
+        self.samples = collections.deque()
+        self.origin = None
+        self.updates = 0
+        self.flagged = False
+        self.n = 0
+        self.sum_t = self.sum_y = self.sum_tt = self.sum_ty = self.sum_yy = 0.0
+
+    def accumulate(self, t, y, sign):
+        self.n += sign
+        self.sum_t += sign * t
+        self.sum_y += sign * y
+        self.sum_tt += sign * t * t
+        self.sum_ty += sign * t * y
+        self.sum_yy += sign * y * y
+
+    def rebuild(self):
+        """以窗口内最早的样本为时间原点重算累加和, 消除长期加减的累积误差"""
+        shift = self.samples[0][0]
+        self.origin += shift
+        self.samples = collections.deque((t - shift, y) for t, y in self.samples)
+        self.n = 0
+        self.sum_t = self.sum_y = self.sum_tt = self.sum_ty = self.sum_yy = 0.0
+        for t, y in self.samples:
+            self.accumulate(t, y, 1)
+        self.updates = 0
+
+    def fit(self):
+        """返回 (斜率, 截距, 残差标准差, 斜率置信度), 样本不足时返回None"""
+        if self.n < 3:
+            return None
+        sxx = self.sum_tt - self.sum_t * self.sum_t / self.n
+        if sxx <= 0:
+            return None
+        sxy = self.sum_ty - self.sum_t * self.sum_y / self.n
+        syy = self.sum_yy - self.sum_y * self.sum_y / self.n
+        slope = sxy / sxx
+        intercept = (self.sum_y - slope * self.sum_t) / self.n
+        sigma = math.sqrt(max(syy - slope * sxy, 0.0) / (self.n - 2))
+        if sigma == 0:
+            confidence = 1.0 if slope > 0 else 0.0
+        else:
+            confidence = statistics.NormalDist().cdf(slope / (sigma / math.sqrt(sxx)))
+        return slope, intercept, sigma, confidence
+
+    def add(self, timestamp, value):
+        """加入一个样本, 增长状态变化时返回 (是否增长, 斜率/小时, 置信度), 否则返回None"""
+        if self.origin is None:
+            self.origin = timestamp / 3600
+        t = timestamp / 3600 - self.origin
+        fit = self.fit()
+        if fit and fit[2] > 0 and self.n >= self.min_samples:
+            predicted = fit[1] + fit[0] * t
+            value = min(max(value, predicted - self.clip * fit[2]), predicted + self.clip * fit[2])
+        self.samples.append((t, value))
+        self.accumulate(t, value, 1)
+        while t - self.samples[0][0] > self.window:
+            self.accumulate(*self.samples.popleft(), -1)
+        self.updates += 1
+        if self.updates >= len(self.samples):
+            self.rebuild()
+        fit = self.fit()
+        ###窗口至少覆盖一半且样本足够时才判定
+        if not fit or self.n < self.min_samples or self.samples[-1][0] - self.samples[0][0] < self.window / 2:
+            return None
+        slope, _, _, confidence = fit
+        if not self.flagged and slope >= self.min_slope and confidence >= self.confidence:
+            self.flagged = True
+            return True, slope, confidence
+        if self.flagged and (slope < self.min_slope / 2 or confidence < 0.8):
+            self.flagged = False
+            return False, slope, confidence
+        return None
+
+def create_leak_trends(windows=None):
+    """每个指标每个窗口一个回归, 返回 {(指标名, 窗口秒数): LeakTrend}"""
+    return {(metric, window): LeakTrend(metric, window, min_slope)
+            for metric, (_, _, min_slope) in LEAK_METRICS.items() for window in (windows or LEAK_WINDOWS)}
+
+def update_leak_trends(timestamp, values):
+    """用本次meminfo更新泄漏趋势, 开始/停止持续增长时记录日志和会话事件"""
+    for (metric, window), trend in leak_trends.items():
+        if values.get(metric) is None:
+            continue
+        change = trend.add(timestamp, values[metric])
+        if change is None:
+            continue
+        growing, slope, confidence = change
+        name, unit, _ = LEAK_METRICS[metric]
+        state = "growing" if growing else "stopped growing"
+        message = f"{name} {state} over {format_window(window)}: {slope:+.1f} {unit}/h (confidence {confidence * 100:.1f}%)"
+        log_message(f"[LEAK] {message}")
+        record_session({"type": "leak", "time": timestamp, "metric": metric, "window": window, "growing": growing,
+                        "slope_per_hour": slope, "confidence": confidence, "message": message})
+
+def draw_zoomed_charts():
+    """切换到汇总级别时直接读取已汇总的数据重绘, 不重新扫描原始数据"""
+    draw_rollup_plot(fps_plot, ["fps"], 'FPS Performance Metrics', chart_zoom)
+    draw_rollup_plot(io_plot, ["read_kb_s", "write_kb_s"], 'IO Performance Metrics', chart_zoom)
+    draw_rollup_plot(cpu_plot, ["cpu"], 'CPU Performance Metrics', chart_zoom)
+    draw_rollup_plot(gpu_plot, ["gpu"], 'GPU Performance Metrics', chart_zoom)
+
+def draw_raw_charts():
+    """用已缓存的最近30个点重绘原始数据, 不追加新数据"""
+    for plot, x, series, title in ((fps_plot, fps_x, [fps_y], 'FPS Performance Metrics'),
+                                   (io_plot, io_x, [io_yR, io_yW], 'IO Performance Metrics'),
+                                   (cpu_plot, cpu_x, [cpu_y], 'CPU Performance Metrics'),
+                                   (gpu_plot, gpu_x, [gpu_y], 'GPU Performance Metrics')):
+        plot.clear()
+        for y in series:
+            plot.plot(x, y)
+        if max(x) < 30:
+            plot.set_xlim(0, 30)
+        plot.set_title(title)
+
 def update_metrics():
     global monitor, canvas
     if monitor:
@@ -271,19 +863,21 @@ def update_metrics():
         update_io_stats()
         update_cpu_stats()
         update_gpu_stats()
+        update_io_top_table()
+        update_fault_table()
+        if chart_zoom != "raw":
+            draw_zoomed_charts()
         canvas.draw()
         # 每隔一段时间更新一次
         root.after(500, update_metrics)  # 每500ms更新一次
     else:
         root.after(100, update_metrics)
 
-def find_indices(header_line):
-    # """从标题行中找到IntendedVsync和FrameCompleted的索引"""
+def find_columns(header_line):
+    """从标题行中找到所有framestats列的索引, 返回 {列名: 索引}"""
     headers = header_line.strip().split(',')
-    intended_vsync_index = headers.index("IntendedVsync")
-    frame_completed_index = headers.index("FrameCompleted")
-    return intended_vsync_index, frame_completed_index
-	
+    return {name: index for index, name in enumerate(headers) if name}
+
 def check_connect():
     """check devices connect state."""
     devices_count = 0
@@ -294,24 +888,339 @@ def check_connect():
     devices_count = len(output.splitlines()) - 1        ###去掉'List of devices attached'
     return devices_count
 
-def get_pid(package_name):
-    """Get the PID of the given package name."""
-    result = subprocess.run(["adb", "shell", "pidof", package_name], capture_output=True, text=True)
-    if result.returncode != 0:
-        return ""
-    return result.stdout.strip()
-
-def get_io_stats(pid):
-    """Get the IO statistics for the given PID."""
-    result = subprocess.run(["adb", "shell", f"cat /proc/{pid}/io"], capture_output=True, text=True)
-    if result.returncode != 0:
-        return None
-    io_stats = {}
+###每个tick通过一次adb shell批量读取的/proc数据: (段名, 命令模板), {pid}/{package}在执行时替换
+PROC_SNAPSHOT_COMMANDS = [
+    ("io", "cat /proc/{pid}/io"),
+    ("stat", "cat /proc/{pid}/stat"),
+    ("pidof", "pidof {package}"),
+    ("diskstats", "cat /proc/diskstats"),
+    ###进程内所有线程, 输出形如 "1234/schedstat:运行ns 等待ns 时间片数"
+    ("task_comm", "(cd /proc/{pid}/task && grep '' */comm)"),
+    ("task_schedstat", "(cd /proc/{pid}/task && grep '' */schedstat)"),
+    ("task_status", "(cd /proc/{pid}/task && grep -E '^(voluntary|nonvoluntary)_ctxt_switches' */status)"),
+]
+
+def get_proc_snapshot(package_name, pid):
+    """一次adb调用读取所有需要的/proc数据, 返回 {段名: [行]}, 读取失败的段为空列表"""
+    commands = (PROC_SNAPSHOT_COMMANDS + (PER_THREAD_SNAPSHOT_COMMANDS if per_thread_enabled else [])
+                + (system_io.commands() if system_io_enabled and system_io else []))
+    script = "; ".join(f"echo '#{section}'; " + command.format(pid=pid, package=package_name) + " 2>/dev/null"
+                       for section, command in commands)
+    result = subprocess.run(["adb", "shell", script], capture_output=True, text=True)
+    snapshot = {section: [] for section, _ in commands}
+    lines = None
     for line in result.stdout.splitlines():
-        key, value = line.split(': ')
-        io_stats[key.strip()] = int(value.strip())
+        if line.startswith("#") and line[1:] in snapshot:
+            lines = snapshot[line[1:]]
+        elif lines is not None and line.strip():
+            lines.append(line)
+    return snapshot
+
+def parse_io_lines(lines):
+    """解析/proc/<pid>/io的行"""
+    io_stats = {}
+    for line in lines:
+        if ": " in line:
+            key, value = line.split(': ', 1)
+            io_stats[key.strip()] = int(value.strip())
     return io_stats
 
+SMALL_WRITE_SYSCALLS = 200     ###每秒write系统调用超过200次
+SMALL_WRITE_BYTES = 4096        ###且平均每次写入不足4KB, 视为小块写入风暴(对eMMC寿命和延迟影响最大)
+
+def get_io_rates(prev_io_stats, current_io_stats, interval_time):
+    """由/proc/<pid>/io两次读数计算全部IO速率:
+    rchar/wchar为包括页缓存命中在内的读写量, syscr/syscw为读写系统调用次数, cancelled_write_bytes为写入前被截断/删除的脏页"""
+    def rate(key):
+        return (current_io_stats.get(key, 0) - prev_io_stats.get(key, 0)) / interval_time
+    io_rates = {
+        "rchar_kb_s": rate("rchar") / 1024,
+        "wchar_kb_s": rate("wchar") / 1024,
+        "syscr_s": rate("syscr"),
+        "syscw_s": rate("syscw"),
+        "cancelled_write_kb_s": rate("cancelled_write_bytes") / 1024,
+    }
+    ###平均每次系统调用的字节数, 本tick没有系统调用时为0
+    io_rates["read_bytes_per_syscall"] = io_rates["rchar_kb_s"] * 1024 / io_rates["syscr_s"] if io_rates["syscr_s"] > 0 else 0.0
+    io_rates["write_bytes_per_syscall"] = io_rates["wchar_kb_s"] * 1024 / io_rates["syscw_s"] if io_rates["syscw_s"] > 0 else 0.0
+    return io_rates
+
+###重点关注的线程: {角色: 线程名}, None表示主线程(tid == pid)
+SCHED_THREADS = {"main": None, "render": "RenderThread"}
+SCHED_RATE_KEYS = ("run_ms_s", "runq_ms_s", "runq_per_slice_ms", "vcsw_s", "ivcsw_s")
+
+def parse_task_lines(lines):
+    """解析 "tid/文件:内容" 形式的行, 返回 [(tid, 内容)]"""
+    entries = []
+    for line in lines:
+        path, _, content = line.partition(":")
+        tid = path.split("/", 1)[0]
+        if tid.isdigit():
+            entries.append((tid, content))
+    return entries
+
+def parse_thread_stats(snapshot):
+    """由批量快照得到每个线程的调度统计 {tid: {"name", "run_ns", "wait_ns", "slices", "vcsw", "ivcsw"}}"""
+    threads = {}
+    for tid, name in parse_task_lines(snapshot.get("task_comm", [])):
+        threads[tid] = {"name": name.strip()}
+    for tid, content in parse_task_lines(snapshot.get("task_schedstat", [])):
+        fields = content.split()
+        if tid in threads and len(fields) >= 3:
+            threads[tid].update(run_ns=int(fields[0]), wait_ns=int(fields[1]), slices=int(fields[2]))
+    for tid, content in parse_task_lines(snapshot.get("task_status", [])):
+        key, _, value = content.partition(":")
+        if tid in threads and value.strip().isdigit():
+            threads[tid]["vcsw" if key == "voluntary_ctxt_switches" else "ivcsw"] = int(value)
+    return threads
+
+def get_sched_rates(prev_threads, current_threads, interval_time):
+    """每个线程的调度速率: 每秒运行时间, 每秒在运行队列中等待的时间, 平均每个时间片的等待, 主动/被动上下文切换次数"""
+    sched_rates = {}
+    for tid, current in current_threads.items():
+        prev = prev_threads.get(tid)
+        if not prev or prev.get("name") != current.get("name") or "run_ns" not in current or "run_ns" not in prev:
+            continue
+        slices = current["slices"] - prev["slices"]
+        wait_ms = (current["wait_ns"] - prev["wait_ns"]) / 1000000
+        sched_rates[tid] = {
+            "name": current["name"],
+            "run_ms_s": (current["run_ns"] - prev["run_ns"]) / 1000000 / interval_time,
+            "runq_ms_s": wait_ms / interval_time,
+            "runq_per_slice_ms": wait_ms / slices if slices > 0 else 0.0,
+            "vcsw_s": (current.get("vcsw", 0) - prev.get("vcsw", 0)) / interval_time,
+            "ivcsw_s": (current.get("ivcsw", 0) - prev.get("ivcsw", 0)) / interval_time,
+        }
+    return sched_rates
+
+def key_thread_rates(sched_rates, pid):
+    """从所有线程中取出SCHED_THREADS定义的重点线程, 返回 {角色: 速率}"""
+    key_rates = {}
+    for role, thread_name in SCHED_THREADS.items():
+        for tid, rates in sched_rates.items():
+            if (thread_name is None and tid == str(pid)) or (thread_name is not None and rates["name"] == thread_name):
+                key_rates[role] = rates
+                break
+    return key_rates
+
+def format_sched_rates(rates):
+    return (f"{rates['name']}: run {rates['run_ms_s']:.0f} ms/s, runqueue {rates['runq_ms_s']:.1f} ms/s "
+            f"({rates['runq_per_slice_ms']:.2f} ms/slice), cs {rates['vcsw_s']:.0f}/{rates['ivcsw_s']:.0f} vol/invol per s")
+
+###只统计整块设备(eMMC/UFS/虚拟盘/dm), 分区、loop、ram、zram不计入, 避免重复计算
+DISKSTATS_DEVICE_PATTERN = re.compile(r'^(mmcblk\d+|sd[a-z]+|nvme\d+n\d+|vd[a-z]+|dm-\d+)$')
+###dm设备(加密/verity)建立在sdX/mmcblk之上, 单独显示但不计入合计
+DISKSTATS_STACKED_PATTERN = re.compile(r'^dm-\d+$')
+DISK_BUSY_UTIL = 80     ###设备利用率超过80%时在IO图表上标红
+DISK_RATE_KEYS = ("r_iops", "w_iops", "read_kb_s", "write_kb_s", "queue", "await_ms", "svctm_ms", "util")
+
+def parse_diskstats(lines):
+    """解析/proc/diskstats, 返回 {设备名: [reads, reads_merged, sectors_read, ms_reading, writes, writes_merged,
+    sectors_written, ms_writing, ios_in_progress, ms_io, weighted_ms_io]}"""
+    diskstats = {}
+    for line in lines:
+        fields = line.split()
+        if len(fields) >= 14 and DISKSTATS_DEVICE_PATTERN.match(fields[2]):
+            diskstats[fields[2]] = [int(value) for value in fields[3:14]]
+    return diskstats
+
+def get_disk_rates(prev_diskstats, current_diskstats, interval_time):
+    """由两次/proc/diskstats计算每个设备的IOPS、吞吐量、平均队列深度、await和service time(与iostat -x相同),
+    另外返回物理设备合计 "total" (util和queue取最大设备, dm设备不计入)"""
+    disk_rates = {}
+    total = dict.fromkeys(DISK_RATE_KEYS, 0.0)
+    total_ios = total_wait_ms = total_io_ms = 0
+    for device, current in current_diskstats.items():
+        prev = prev_diskstats.get(device)
+        if prev is None:
+            continue
+        diff = [max(now - before, 0) for now, before in zip(current, prev)]
+        ios = diff[0] + diff[4]
+        rates = {
+            "r_iops": diff[0] / interval_time,
+            "w_iops": diff[4] / interval_time,
+            "read_kb_s": diff[2] * 512 / 1024 / interval_time,
+            "write_kb_s": diff[6] * 512 / 1024 / interval_time,
+            "queue": diff[10] / (interval_time * 1000),
+            "await_ms": (diff[3] + diff[7]) / ios if ios else 0.0,
+            "svctm_ms": diff[9] / ios if ios else 0.0,
+            "util": min(diff[9] / (interval_time * 1000) * 100, 100.0),
+        }
+        disk_rates[device] = rates
+        if DISKSTATS_STACKED_PATTERN.match(device):
+            continue
+        for key in ("r_iops", "w_iops", "read_kb_s", "write_kb_s"):
+            total[key] += rates[key]
+        total["queue"] = max(total["queue"], rates["queue"])
+        total["util"] = max(total["util"], rates["util"])
+        total_ios += ios
+        total_wait_ms += diff[3] + diff[7]
+        total_io_ms += diff[9]
+    total["await_ms"] = total_wait_ms / total_ios if total_ios else 0.0
+    total["svctm_ms"] = total_io_ms / total_ios if total_ios else 0.0
+    disk_rates["total"] = total
+    return disk_rates
+
+def busiest_disk(disk_rates):
+    """利用率最高的物理设备 (设备名, 速率), 没有设备时返回 (None, 合计)"""
+    devices = [(device, rates) for device, rates in disk_rates.items()
+               if device != "total" and not DISKSTATS_STACKED_PATTERN.match(device)]
+    if not devices:
+        return None, disk_rates["total"]
+    return max(devices, key=lambda item: item[1]["util"])
+
+def format_disk_rates(device, rates):
+    return (f"{device}: {rates['r_iops']:.0f}/{rates['w_iops']:.0f} r/w IOPS, {rates['read_kb_s']:.0f}/{rates['write_kb_s']:.0f} r/w kB/s, "
+            f"queue {rates['queue']:.2f}, await {rates['await_ms']:.1f} ms, svctm {rates['svctm_ms']:.1f} ms, util {rates['util']:.0f}%")
+
+SYSTEM_IO_TOP_N = 10
+SYSTEM_IO_NAME_REFRESH = 20     ###每20个tick重新读取一次进程名, 处理PID复用
+###所有进程的IO和进程名, 用grep一次读取全部文件, 输出形如 "1234/io:read_bytes: 4096"
+SYSTEM_IO_COMMAND = ("all_io", "(cd /proc && grep -E '^(read|write)_bytes' [0-9]*/io)")
+SYSTEM_IO_NAME_COMMAND = ("all_comm", "(cd /proc && grep '' [0-9]*/comm)")
+system_io_enabled = False
+system_io = None
+
+class SystemIoTop:
+    """全系统按进程统计IO(类似iotop): 随批量快照读取所有进程的/proc/<pid>/io, 在主机侧计算差值"""
+
+    def __init__(self, top_n=SYSTEM_IO_TOP_N):
+        self.top_n = top_n
+        self.names = {}             ###{pid: 进程名}缓存
+        self.names_stale = True     ###出现缓存中没有的PID时, 下个tick重新读取进程名
+        self.name_ticks = 0
+        self.prev = {}              ###{pid: [read_bytes, write_bytes]}
+        self.prev_time = None
+        self.top = []               ###[{"pid", "name", "read_kb_s", "write_kb_s"}], 按读+写降序
+
+    def commands(self):
+        """本tick需要追加到批量快照中的命令"""
+        if self.names_stale or self.name_ticks >= SYSTEM_IO_NAME_REFRESH:
+            return [SYSTEM_IO_COMMAND, SYSTEM_IO_NAME_COMMAND]
+        return [SYSTEM_IO_COMMAND]
+
+    def update(self, snapshot, timestamp):
+        """用本tick的快照更新, 返回IO最多的top_n个进程"""
+        if snapshot.get(SYSTEM_IO_NAME_COMMAND[0]):
+            names = {}
+            for line in snapshot[SYSTEM_IO_NAME_COMMAND[0]]:
+                path, _, name = line.partition(":")
+                names[path.split("/", 1)[0]] = name.strip()
+            self.names = names
+            self.name_ticks = 0
+        else:
+            self.name_ticks += 1
+        current = {}
+        for line in snapshot.get(SYSTEM_IO_COMMAND[0], []):
+            path, _, field = line.partition(":")
+            key, _, value = field.partition(":")
+            value = value.strip()
+            if not value.isdigit():
+                continue
+            current.setdefault(path.split("/", 1)[0], [0, 0])[0 if key == "read_bytes" else 1] = int(value)
+        if not current:
+            return self.top
+        self.names_stale = any(pid_key not in self.names for pid_key in current)
+        top = []
+        if self.prev_time is not None and timestamp > self.prev_time:
+            interval_time = timestamp - self.prev_time
+            for pid_key, (read_bytes, write_bytes) in current.items():
+                if pid_key not in self.prev:
+                    continue
+                ###PID被复用时计数器变小, 按0处理
+                read_kb_s = max(read_bytes - self.prev[pid_key][0], 0) / interval_time / 1024
+                write_kb_s = max(write_bytes - self.prev[pid_key][1], 0) / interval_time / 1024
+                if read_kb_s > 0 or write_kb_s > 0:
+                    top.append({"pid": pid_key, "name": self.names.get(pid_key, "?"), "read_kb_s": read_kb_s, "write_kb_s": write_kb_s})
+            top.sort(key=lambda item: item["read_kb_s"] + item["write_kb_s"], reverse=True)
+        self.prev = current
+        self.prev_time = timestamp
+        self.top = top[:self.top_n]
+        return self.top
+
+def format_system_io_top(top, count=5):
+    return ", ".join(f"{item['name']}({item['pid']}) r {item['read_kb_s']:.0f} w {item['write_kb_s']:.0f}" for item in top[:count])
+
+def parse_proc_stat(line):
+    """解析/proc/<pid>/stat, 进程名可能包含空格, 返回进程名之后的字段(下标0为第3个字段state)"""
+    return line[line.rindex(")") + 2:].split()
+
+###线程级模式: 额外读取进程内所有线程的stat
+PER_THREAD_SNAPSHOT_COMMANDS = [
+    ("task_stat", "(cd /proc/{pid}/task && grep '' */stat)"),
+]
+PER_THREAD_TOP_N = 10
+MAJOR_FAULT_ALERT = 50      ###每秒major fault超过50次时在IO图表上标红
+per_thread_enabled = False
+
+def parse_fault_counts(line):
+    """从stat行取出 (minflt, majflt)"""
+    fields = parse_proc_stat(line)
+    return int(fields[7]), int(fields[9])
+
+def get_fault_rates(prev_faults, current_faults, interval_time):
+    """minor/major缺页速率(次/秒), major fault需要从存储读取页面, 表现为没有CPU占用的卡顿"""
+    return {"minflt_s": (current_faults[0] - prev_faults[0]) / interval_time,
+            "majflt_s": (current_faults[1] - prev_faults[1]) / interval_time}
+
+def parse_thread_faults(lines):
+    """解析线程级stat, 返回 {tid: (线程名, minflt, majflt)}"""
+    thread_faults = {}
+    for tid, content in parse_task_lines(lines):
+        if ")" in content:
+            thread_faults[tid] = (content[content.find("(") + 1:content.rindex(")")], *parse_fault_counts(content))
+    return thread_faults
+
+def get_thread_fault_rates(prev_thread_faults, current_thread_faults, interval_time):
+    """每个线程的缺页速率, 按major、minor降序, 只返回有缺页的前PER_THREAD_TOP_N个线程"""
+    thread_rates = []
+    for tid, (name, minflt, majflt) in current_thread_faults.items():
+        prev = prev_thread_faults.get(tid)
+        if not prev or prev[0] != name:
+            continue
+        rates = get_fault_rates(prev[1:], (minflt, majflt), interval_time)
+        if rates["minflt_s"] > 0 or rates["majflt_s"] > 0:
+            thread_rates.append({"tid": tid, "name": name, **rates})
+    thread_rates.sort(key=lambda item: (item["majflt_s"], item["minflt_s"]), reverse=True)
+    return thread_rates[:PER_THREAD_TOP_N]
+
+def format_fault_rates(rates):
+    return f"minor {rates['minflt_s']:.0f}/s, major {rates['majflt_s']:.1f}/s"
+
+def resolve_pid(package_name):
+    """pidof可能返回多个PID, 优先选择cmdline与包名完全一致的主进程"""
+    result = subprocess.run(["adb", "shell", f"for p in $(pidof {package_name}); do echo \"$p $(tr '\\0' ' ' < /proc/$p/cmdline)\"; done"],
+                            capture_output=True, text=True)
+    candidates = [line.split(None, 1) for line in result.stdout.splitlines() if line.strip()]
+    if not candidates:
+        return ""
+    if len(candidates) > 1:
+        log_message(f"Found multiple PIDs for {package_name}: {', '.join(candidate[0] for candidate in candidates)}")
+    for candidate in candidates:
+        if len(candidate) > 1 and candidate[1].strip() == package_name:
+            return candidate[0]
+    return candidates[0][0]
+
+def track_process(package_name, snapshot):
+    """用本tick的批量快照校验PID: 进程起始时间不变为"ok", 进程已重启返回"restarted", 进程不存在返回"missing" """
+    global pid, pid_start_time, process_restarts
+    if snapshot["stat"]:
+        start_time = parse_proc_stat(snapshot["stat"][0])[19]
+        if pid_start_time is None or start_time == pid_start_time:
+            pid_start_time = start_time
+            return "ok"
+    if not snapshot["pidof"]:
+        return "missing"
+    new_pid = resolve_pid(package_name)
+    if not new_pid:
+        return "missing"
+    old_pid = pid
+    pid = new_pid
+    pid_start_time = None
+    process_restarts += 1
+    log_message(f"Process restarted: {package_name} PID {old_pid} -> {pid}")
+    return "restarted"
+
 def get_foreground_window_name(package_name):
     """Get the foreground window name for the given package name."""
     result = subprocess.run(["adb", "shell", "dumpsys window | grep -E 'mCurrentFocus|mFocusedApp'"], capture_output=True, text=True)
@@ -330,77 +1239,287 @@ def get_foreground_window_name(package_name):
     return None
 
 
-def get_frame_stats(package_name,current_focus_window):
-    """New function to get the frame statistics using gfxinfo."""
-    global last_timestamp,fps,fps_counter
-    intended_vsync_index = 0
-    frame_completed_index = 0
+VSYNC_PERIOD_MS = 16.67
 
-    result = subprocess.run(["adb", "shell", f"dumpsys gfxinfo {package_name} framestats"], capture_output=True, text=True)
-    if result.returncode != 0:
+###FPS算法注册表, {算法名: 函数}, 每个算法输入同一份本次新增帧数据, 返回fps(无新帧时返回None)
+FPS_ALGORITHMS = {}
+
+def register_fps_algorithm(name):
+    """注册FPS算法的装饰器, 算法签名为 func(frames, columns)"""
+    def decorator(func):
+        FPS_ALGORITHMS[name] = func
+        return func
+    return decorator
+
+def frame_times_ms(frames, columns):
+    """每帧耗时(ms): FrameCompleted - IntendedVsync"""
+    return (frames[:, columns["FrameCompleted"]] - frames[:, columns["IntendedVsync"]]) / 1000000
+
+@register_fps_algorithm("vsync")
+def fps_vsync_overrun(frames, columns):
+    """新算法: 按超出垂直同步的次数折算FPS"""
+    frame_times = frame_times_ms(frames, columns)
+    frame_count = len(frame_times)
+    if frame_count == 0:
         return None
-    lines = result.stdout.splitlines()
-    timestamps = []
-    each_frame_timestamps = []
+    # 统计丢帧和需要垂直同步次数
+    janky = frame_times[frame_times > VSYNC_PERIOD_MS]
+    vsync_over = np.where(janky % VSYNC_PERIOD_MS == 0, janky / VSYNC_PERIOD_MS - 1, np.floor(janky / VSYNC_PERIOD_MS))
+    vsyncOverTimes = vsync_over.sum()
+    return frame_count / (frame_count + vsyncOverTimes) * 60
+
+@register_fps_algorithm("average")
+def fps_average_frame_time(frames, columns):
+    """旧算法: 只统计Flags为0的帧, 帧耗时不足16.67ms按16.67ms计, 取平均帧耗时换算FPS"""
+    frame_times = frame_times_ms(frames, columns)
+    if "Flags" in columns:
+        frame_times = frame_times[frames[:, columns["Flags"]] == 0]
+    if len(frame_times) == 0:
+        return None
+    FPS_frame_times = np.maximum(frame_times, VSYNC_PERIOD_MS)
+    return 1000 / FPS_frame_times.mean()
+
+def parse_frame_data(lines, package_name):
+    """解析framestats输出中目标窗口的PROFILEDATA, 返回(帧数组, {列名: 索引})"""
+    columns = {}
+    rows = []
     isHaveFoundWindow = False
     PROFILEDATA_line = 0
 
     for line in lines:
-        ###调试一下
         if "Window" in line and package_name in line:
             isHaveFoundWindow = True
             continue
         if isHaveFoundWindow and "---PROFILEDATA---" in line:
             PROFILEDATA_line += 1
+            if PROFILEDATA_line >= 2:
+                break
             continue
         if isHaveFoundWindow and "IntendedVsync" in line:
-            intended_vsync_index, frame_completed_index = find_indices(line)
+            columns = find_columns(line)
             continue
-        if isHaveFoundWindow and PROFILEDATA_line == 1 and intended_vsync_index != 0 and frame_completed_index != 0:
+        if isHaveFoundWindow and PROFILEDATA_line == 1 and columns:
             # 此处代表的是当前活动窗口
-            fields = []
-            fields = line.split(",")
-            each_frame_timestamp = [float(fields[intended_vsync_index]), float(fields[frame_completed_index])]
-            each_frame_timestamps.append(each_frame_timestamp)
+            fields = line.strip().split(",")
+            if len(fields) >= len(columns):
+                rows.append(fields[:len(columns)])
+
+    if not rows:
+        return np.empty((0, len(columns))), columns
+    return np.array(rows, dtype=np.float64), columns
+
+def drop_repeated_frames(frames, columns):
+    """去除上一次已统计过的重复帧, 通过每帧的起始时间(IntendedVsync)判断"""
+    global last_timestamp
+    if len(frames) == 0:
+        return frames
+    intended_vsync = frames[:, columns["IntendedVsync"]]
+    # 与逐帧比较last_timestamp等价: 只保留起始时间严格大于此前所有帧的帧
+    running_max = np.maximum.accumulate(np.concatenate(([last_timestamp], intended_vsync)))[:-1]
+    frames = frames[intended_vsync > running_max]
+    if len(frames) > 0:
+        last_timestamp = frames[-1, columns["IntendedVsync"]]
+    return frames
+
+###帧耗时直方图: 1ms~10s按对数均分桶(每十倍40个桶, 相对误差约6%), 首尾各有一个溢出桶
+FRAME_HIST_EDGES = 10 ** (np.arange(0, 4 * 40 + 1) / 40)
+FRAME_PERCENTILES = (50, 90, 95, 99)
+
+class FrameTimeHistogram:
+    """固定分桶的帧耗时直方图, 桶边界固定, 可在不同设备/不同会话之间直接合并"""
+
+    def __init__(self):
+        self.counts = np.zeros(len(FRAME_HIST_EDGES) + 1, dtype=np.int64)
+        self.max_value = 0.0
+        self.sum_value = 0.0
+
+    def add(self, frame_times):
+        """加入一批帧耗时(ms)"""
+        if len(frame_times) == 0:
+            return
+        buckets = np.searchsorted(FRAME_HIST_EDGES, frame_times, side='right')
+        self.counts += np.bincount(buckets, minlength=len(self.counts))
+        self.max_value = max(self.max_value, float(np.max(frame_times)))
+        self.sum_value += float(np.sum(frame_times))
+
+    def merge(self, other):
+        """合并另一个直方图(其他设备或其他会话)"""
+        self.counts += other.counts
+        self.max_value = max(self.max_value, other.max_value)
+        self.sum_value += other.sum_value
+        return self
+
+    def total(self):
+        return int(self.counts.sum())
+
+    def percentile(self, q):
+        """按桶估算百分位帧耗时(ms), 取所在桶的上边界且不超过最大值"""
+        total = self.total()
+        if total == 0:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.counts), math.ceil(total * q / 100)))
+        upper = FRAME_HIST_EDGES[min(index, len(FRAME_HIST_EDGES) - 1)]
+        return float(min(upper, self.max_value))
+
+    def summary(self):
+        """返回 {'p50':..., 'p90':..., 'p95':..., 'p99':..., 'max':...}"""
+        result = {f"p{q}": self.percentile(q) for q in FRAME_PERCENTILES}
+        result["max"] = self.max_value
+        return result
+
+    def to_dict(self):
+        return {"counts": self.counts.tolist(), "max": self.max_value, "sum": self.sum_value}
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls()
+        hist.counts = np.array(data["counts"], dtype=np.int64)
+        hist.max_value = float(data["max"])
+        hist.sum_value = float(data.get("sum", 0.0))
+        return hist
+
+class RollingFrameTimeHistogram(FrameTimeHistogram):
+    """最近window个tick的帧耗时直方图, 每个tick增量加入新桶计数并减去过期的桶计数"""
+
+    def __init__(self, window=60):
+        super().__init__()
+        self.window = window
+        self.ticks = []     ###[(该tick的桶计数, 该tick最大帧耗时, 该tick帧耗时总和)]
+
+    def add(self, frame_times):
+        tick = FrameTimeHistogram()
+        tick.add(frame_times)
+        self.ticks.append((tick.counts, tick.max_value, tick.sum_value))
+        self.counts += tick.counts
+        self.sum_value += tick.sum_value
+        if len(self.ticks) > self.window:
+            expired_counts, _, expired_sum = self.ticks.pop(0)
+            self.counts -= expired_counts
+            self.sum_value -= expired_sum
+        self.max_value = max(tick_max for _, tick_max, _ in self.ticks)
+
+def format_frame_percentiles(hist):
+    """将直方图百分位格式化为日志文本"""
+    summary = hist.summary()
+    return "/".join(f"{summary[key]:.1f}" for key in summary) + " ms"
+
+###帧阶段划分: (阶段名, 起始列, 结束列, 所属线程)
+FRAME_STAGES = [
+    ("input", "HandleInputStart", "AnimationStart", "UI thread"),
+    ("animation", "AnimationStart", "PerformTraversalsStart", "UI thread"),
+    ("layout", "PerformTraversalsStart", "DrawStart", "UI thread"),
+    ("draw", "DrawStart", "SyncQueued", "UI thread"),
+    ("sync", "SyncStart", "IssueDrawCommandsStart", "RenderThread"),
+    ("issue", "IssueDrawCommandsStart", "SwapBuffers", "RenderThread"),
+    ("gpu", "SwapBuffers", "GpuCompleted", "GPU"),
+]
+
+def frame_stage_durations(frames, columns):
+    """按列向量化计算每帧各阶段耗时(ms), 返回 {阶段名: 数组}, 缺失或无效的时间戳记为nan"""
+    durations = {}
+    for name, start_column, end_column, _ in FRAME_STAGES:
+        if start_column not in columns or end_column not in columns:
             continue
-        if PROFILEDATA_line >= 2:
-            break
-    
-    # 需要在计算次数前去除重复帧，通过每帧的起始时间去判断是否是重复的
-    for timestamp in each_frame_timestamps:
-            if timestamp[0] > last_timestamp:
-                timestamps.append((timestamp[1] - timestamp[0]) / 1000000)
-                last_timestamp = timestamp[0]
-
-    janky_list = []
-    vsyncOverTimes = 0
+        start = frames[:, columns[start_column]]
+        end = frames[:, columns[end_column]]
+        valid = (start > 0) & (end >= start)
+        durations[name] = np.where(valid, (end - start) / 1000000, np.nan)
+    return durations
+
+def get_frame_stage_stats(frames, columns):
+    """统计本次新增帧各阶段的平均/最大耗时, 并按线程汇总找出瓶颈"""
+    stage_stats = {}
+    thread_totals = {}
+    for name, stage_times in frame_stage_durations(frames, columns).items():
+        stage_times = stage_times[~np.isnan(stage_times)]
+        if len(stage_times) == 0:
+            continue
+        stage_stats[name] = {"mean": float(stage_times.mean()), "max": float(stage_times.max())}
+    for name, _, _, thread in FRAME_STAGES:
+        if name in stage_stats:
+            thread_totals[thread] = thread_totals.get(thread, 0.0) + stage_stats[name]["mean"]
+    bottleneck = max(thread_totals, key=thread_totals.get) if thread_totals else None
+    return stage_stats, bottleneck
+
+def format_frame_stages(stage_stats, bottleneck):
+    """将帧阶段统计格式化为日志文本"""
+    stages = ", ".join(f"{name} {stats['mean']:.1f}/{stats['max']:.1f}" for name, stats in stage_stats.items())
+    return f"Frame stages mean/max (ms): {stages}; bottleneck: {bottleneck}"
+
+def get_frame_stats(package_name,current_focus_window):
+    """New function to get the frame statistics using gfxinfo."""
+    global fps,fps_counter,fps_results,frame_stages,frame_bottleneck,janky_percent,max_frame_time,new_frame_count
+
+    new_frame_count = 0
+    result = subprocess.run(["adb", "shell", f"dumpsys gfxinfo {package_name} framestats"], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    frames, columns = parse_frame_data(result.stdout.splitlines(), package_name)
+    if "IntendedVsync" not in columns or "FrameCompleted" not in columns:
+        return fps, "Janky frames: 0 (0.00%)"
+    frames = drop_repeated_frames(frames, columns)
+    new_frame_count = len(frames)
+    frame_hist_window.add(frame_times_ms(frames, columns))
+    update_touch_latency(frames, columns)
+    update_gesture_frames(frames, columns)
+
+    janky_count = 0
     FER = 0.00
     janke_frames = ""
+    max_frame_time = 0.0
     ###界面没有刷新,维持上一次刷新的FPS
-    if len(timestamps) == 0:
+    if len(frames) == 0:
         pass
     else:
-        frame_count = len(timestamps)
-         # 统计丢帧和需要垂直同步次数
-        for timestamp in timestamps:
-            if timestamp > 16.67:
-                # 超过16.67ms
-                janky_list.append(timestamp)
-                if timestamp % 16.67 == 0:
-                    vsyncOverTimes += ((timestamp / 16.67) - 1)
-                else:
-                    vsyncOverTimes += math.floor(timestamp / 16.67)
-
-        fps = frame_count / (frame_count + vsyncOverTimes) * 60
-        FER = len(janky_list) / frame_count * 100
+        ###所有注册的算法使用同一份帧数据计算, 不额外访问设备
+        for name, algorithm in FPS_ALGORITHMS.items():
+            value = algorithm(frames, columns)
+            if value is not None:
+                fps_results[name] = value
+        fps = fps_results.get(fps_algorithm, fps)
+
+        frame_times = frame_times_ms(frames, columns)
+        frame_hist_session.add(frame_times)
+        max_frame_time = float(frame_times.max())
+        frame_stages, frame_bottleneck = get_frame_stage_stats(frames, columns)
+        janky_count = int(np.count_nonzero(frame_times > VSYNC_PERIOD_MS))
+        FER = janky_count / len(frame_times) * 100
+        janky_percent = FER
         ###用于观察图表数据是否有变化          
         fps_counter += 1
         if fps_counter == 100:
             fps_counter = 0
 
-    janke_frames = f"Janky frames: {len(janky_list)} ({FER:.2f}%)"
+    janke_frames = f"Janky frames: {janky_count} ({FER:.2f}%)"
     return fps,janke_frames
 
+def format_fps_results():
+    """将各算法的FPS格式化为日志文本, 主算法排在第一位"""
+    names = [fps_algorithm] + [name for name in fps_results if name != fps_algorithm]
+    return ", ".join(f"{name}: {fps_results[name]:.2f}" for name in names if name in fps_results)
+
+def parse_meminfo(lines):
+    """解析dumpsys meminfo <package>的输出"""
+    memory_usage = {}
+    for line in lines:
+        if "TOTAL PSS" in line:
+            parts = line.split()
+            memory_usage["TOTAL PSS"] = parts[2]
+            memory_usage["TOTAL RSS"] = parts[5]
+        elif "Views" in line and "WebViews" not in line:
+            parts = line.split()
+            memory_usage["Views"] = parts[1] 
+        elif "Activities" in line:
+            parts = line.split()
+            memory_usage["Activities"] = parts[3]   
+        elif line.strip().startswith(("Java Heap:", "Native Heap:")):
+            ###App Summary中的Java/Native堆PSS
+            name, _, value = line.strip().partition(":")
+            memory_usage[name] = value.split()[0]
+        else: 
+            pass
+    return memory_usage
+
 def get_meminfo(package_name):
     """Get the memory used info."""
     global last_meminfo_io
@@ -408,23 +1527,10 @@ def get_meminfo(package_name):
         result = subprocess.run(["adb", "shell", f"dumpsys meminfo {package_name}"], capture_output=True, text=True)
         if result.returncode!= 0:
             return None
-        memory_usage = {}
-        lines = result.stdout.splitlines()
-        for line in lines:
-            if "TOTAL PSS" in line:
-                parts = line.split()
-                memory_usage["TOTAL PSS"] = parts[2]
-                memory_usage["TOTAL RSS"] = parts[5]
-                memory_usage["meminfo_io"] = int(parts[2]) - last_meminfo_io
-                last_meminfo_io = int(parts[2])
-            elif "Views" in line and "WebViews" not in line:
-                parts = line.split()
-                memory_usage["Views"] = parts[1] 
-            elif "Activities" in line:
-                parts = line.split()
-                memory_usage["Activities"] = parts[3]   
-            else: 
-                pass
+        memory_usage = parse_meminfo(result.stdout.splitlines())
+        if "TOTAL PSS" in memory_usage:
+            memory_usage["meminfo_io"] = int(memory_usage["TOTAL PSS"]) - last_meminfo_io
+            last_meminfo_io = int(memory_usage["TOTAL PSS"])
         return memory_usage
 
     except Exception as e:
@@ -443,33 +1549,399 @@ def get_current_focus_window():
         if "mCurrentFocus" in line:
             parts = line.split()
             if len(parts) > 1:
-                activity = parts[-1][:-1]
-                packageName = activity.split("/")[0]
-                if "/." in activity:
-                    activityName = packageName + "/" + packageName + "." + activity.split("/.")[1]
-                else:
-                    activityName = activity
-                return activityName
+                return normalize_activity_name(parts[-1][:-1])
+    return None
+
+def normalize_activity_name(activity):
+    """com.xx/.MainActivity -> com.xx/com.xx.MainActivity"""
+    packageName = activity.split("/")[0]
+    if "/." in activity:
+        activityName = packageName + "/" + packageName + "." + activity.split("/.")[1]
+    else:
+        activityName = activity
+    return activityName
+
+###event log中的焦点变化: Android 10+为input_focus, 旧版本为am_focused_activity/wm_set_resumed_activity
+FOCUS_EVENT_PATTERNS = [
+    re.compile(r'input_focus: \[Focus entering \S+ ([^\s,\]]+)'),
+    re.compile(r'(?:am_focused_activity|wm_focused_activity|wm_set_resumed_activity): \[\d+,([^,\]]+)'),
+]
+FOCUS_EVENT_TAGS = ["input_focus:I", "am_focused_activity:I", "wm_focused_activity:I", "wm_set_resumed_activity:I"]
+FOCUS_STREAM_RETRY = 5      ###事件流断开后5s重连, 期间回退到dumpsys window
+
+def parse_focus_event(line):
+    """从event log行中解析获得焦点的窗口, 不是焦点进入事件时返回None"""
+    for pattern in FOCUS_EVENT_PATTERNS:
+        match = pattern.search(line)
+        if match:
+            return normalize_activity_name(match.group(1))
+    return None
+
+def monitor_focus_events():
+    """常驻读取event log中的焦点变化事件, 在内存中维护当前焦点窗口"""
+    global focus_process, tracked_focus_window, focus_stream_alive
+    offset = get_device_clock_offset()
+    while not stop_threads:
+        ###启动或重连时先用dumpsys window取一次当前焦点, 之后只依赖事件流
+        tracked_focus_window = get_current_focus_window()
+        stream_start = time.time()
+        focus_process = subprocess.Popen(["adb", "logcat", "-b", "events", "-v", "epoch", "-T", "1", "-s"] + FOCUS_EVENT_TAGS,
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        focus_stream_alive = True
+        try:
+            for line in iter(focus_process.stdout.readline, ''):
+                if stop_threads:
+                    break
+                match = LOGCAT_LINE_PATTERN.match(line)
+                if not match or float(match.group(1)) + offset < stream_start - 1:   ###-T 1 输出的最后一条历史日志, 会覆盖dumpsys取到的当前焦点
+                    continue
+                window = parse_focus_event(line)
+                if window:
+                    tracked_focus_window = window
+        finally:
+            focus_stream_alive = False
+            focus_process.kill()
+            focus_process.wait()
+        if not stop_threads:
+            log_message("Focus event stream lost, falling back to dumpsys window")
+            time.sleep(FOCUS_STREAM_RETRY)
+
+def get_tracked_focus_window():
+    """事件流正常时直接返回内存中的焦点窗口, 否则回退到dumpsys window"""
+    if focus_stream_alive and tracked_focus_window:
+        return tracked_focus_window
+    return get_current_focus_window()
+
+###logcat流: (名称, 缓冲区, 标签过滤, 是否按PID过滤), 都在设备端过滤, 只传输需要的行
+###应用流已按PID过滤, 不再按标签过滤: ART的GC日志标签随版本不同为art/zygote/zygote64或被截断的进程名(如e.myapplicatio)
+LOGCAT_STREAMS = [
+    ("app", "main", ["*:I"], True),
+    ("system", "events", ["am_anr:I"], False),
+]
+LOGCAT_STREAM_RETRY = 5
+LOGCAT_EVENT_MIN_GC_MS = 5      ###GC停顿超过5ms才单独记录为时间线事件, 更短的只计入每个tick的汇总
+###logcat -v epoch 输出格式: 1697712345.123  1234  1250 I tag     : message
+LOGCAT_LINE_PATTERN = re.compile(r'^\s*(\d+\.\d+)\s+(\d+)\s+(\d+)\s+\w\s+(.*?)\s*: (.*)$')
+LOGCAT_DURATION = r'[\d.]+(?:us|ms|s)'
+LOGCAT_EVENT_PATTERNS = [
+    ("gc", re.compile(rf'(\w[\w ]*?) GC freed .*?paused ({LOGCAT_DURATION}(?:,{LOGCAT_DURATION})*) total ({LOGCAT_DURATION})')),
+    ("gc_wait", re.compile(rf'WaitForGcToComplete blocked (\S+) on (\S+) for ({LOGCAT_DURATION})')),
+    ("skipped_frames", re.compile(r'Skipped (\d+) frames')),
+    ("slow_looper", re.compile(r'Slow (dispatch|delivery) took (\d+)ms (\S+)')),
+    ("anr", re.compile(r'^\[\d+,(\d+),([^,]+),\d+,(.*)\]$')),
+]
+LOGCAT_SAMPLE_KEYS = ("gc_pause_ms", "gc_count", "skipped_frames", "slow_looper_ms", "anr")
+
+def duration_ms(text):
+    """ART日志中的时长(123us/4.5ms/1.2s)转换为ms"""
+    for unit, scale in (("us", 0.001), ("ms", 1.0), ("s", 1000.0)):
+        if text.endswith(unit):
+            return float(text[:-len(unit)]) * scale
+    return float(text)
+
+def parse_logcat_event(tag, message, package_name):
+    """从一行logcat中提取GC停顿、丢帧、Looper慢消息和ANR, 返回 {"kind", "value", "message"}, 无关的行返回None"""
+    for kind, pattern in LOGCAT_EVENT_PATTERNS:
+        match = pattern.search(message)
+        if not match:
+            continue
+        if kind == "gc":
+            pause = sum(duration_ms(item) for item in match.group(2).split(","))
+            return {"kind": kind, "value": pause, "message": f"{match.group(1)} GC paused {pause:.1f} ms, total {duration_ms(match.group(3)):.1f} ms"}
+        if kind == "gc_wait":
+            blocked = duration_ms(match.group(3))
+            return {"kind": kind, "value": blocked, "message": f"{match.group(1)} blocked {blocked:.1f} ms waiting for {match.group(2)} GC"}
+        if kind == "skipped_frames":
+            return {"kind": kind, "value": int(match.group(1)), "message": f"Choreographer skipped {match.group(1)} frames"}
+        if kind == "slow_looper":
+            return {"kind": kind, "value": int(match.group(2)), "message": f"Slow {match.group(1)} {match.group(2)} ms on {match.group(3)}"}
+        if kind == "anr" and tag == "am_anr" and (match.group(2) == package_name or match.group(2).startswith(package_name + ":")):
+            return {"kind": kind, "value": 1, "message": f"ANR in {match.group(2)} (PID {match.group(1)}): {match.group(3)}"}
     return None
 
+def get_device_clock_offset():
+    """主机时间 - 设备时间(秒), 用于把logcat时间戳对齐到采样时间线, 读取失败时为0"""
+    start = time.time()
+    result = subprocess.run(["adb", "shell", "date +%s.%N"], capture_output=True, text=True)
+    end = time.time()
+    try:
+        return (start + end) / 2 - float(result.stdout.strip())
+    except ValueError:
+        return 0.0
+
+def monitor_logcat(stream, package_name):
+    """常驻读取一路logcat, 解析出的事件按主机时间放入logcat_event_queue; 按PID过滤的流在进程重启后用新PID重连"""
+    name, buffer, tags, by_pid = stream
+    offset = get_device_clock_offset()
+    while not stop_threads:
+        stream_pid = pid
+        stream_start = time.time()
+        command = ["adb", "logcat", "-b", buffer, "-v", "epoch", "-T", "1"]
+        if by_pid:
+            command.append(f"--pid={stream_pid}")
+        command += ["-s"] + tags
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, errors="replace")
+        logcat_processes[name] = process
+        try:
+            for line in iter(process.stdout.readline, ''):
+                if stop_threads:
+                    break
+                match = LOGCAT_LINE_PATTERN.match(line)
+                if not match:
+                    continue
+                event = parse_logcat_event(match.group(4), match.group(5), package_name)
+                if not event:
+                    continue
+                event_time = float(match.group(1)) + offset
+                if event_time < stream_start - 1:   ###-T 1 输出的最后一条历史日志
+                    continue
+                event = {"type": "logcat", "time": event_time, **event}
+                logcat_event_queue.put(event)
+                if event["kind"] not in ("gc", "gc_wait") or event["value"] >= LOGCAT_EVENT_MIN_GC_MS:
+                    log_message(f"[LOGCAT] {event['message']}")
+                    record_session(event)
+        finally:
+            process.kill()
+            process.wait()
+        if stop_threads:
+            break
+        if by_pid and stream_pid != pid:
+            continue
+        log_message(f"Logcat {name} stream lost, reconnecting in {LOGCAT_STREAM_RETRY} s")
+        time.sleep(LOGCAT_STREAM_RETRY)
+
+def drain_logcat_events():
+    """取出上个tick以来的logcat事件, 汇总为本tick的GC停顿/丢帧等数值"""
+    logcat_tick = dict.fromkeys(LOGCAT_SAMPLE_KEYS, 0)
+    while not logcat_event_queue.empty():
+        event = logcat_event_queue.get_nowait()
+        if event["kind"] in ("gc", "gc_wait"):
+            logcat_tick["gc_pause_ms"] += event["value"]
+            logcat_tick["gc_count"] += event["kind"] == "gc"
+        elif event["kind"] == "slow_looper":
+            logcat_tick["slow_looper_ms"] += event["value"]
+        else:
+            logcat_tick[event["kind"]] += event["value"]
+    return logcat_tick
+
+###getevent -lt 输出格式: [   12345.678901] EV_SYN       SYN_REPORT           00000000
+###时间戳为输入子系统的CLOCK_MONOTONIC时间, 与framestats的纳秒时间戳同一时钟
+TOUCH_LINE_PATTERN = re.compile(r'^\[\s*(\d+\.\d+)\]\s+(\S+)\s+(\S+)\s+(\S+)')
+TOUCH_GESTURE_GAP = 0.1     ###不上报BTN_TOUCH/TRACKING_ID的设备, 两次上报间隔超过100ms视为新的手势
+TAP_SLOP = 30               ###手指移动不超过30个坐标单位视为点击
+TAP_TIMEOUT = 0.5           ###不移动且按下超过0.5s视为长按
+FLING_MIN_VELOCITY = 500    ###抬手前100ms内速度超过500坐标单位/s视为惯性滑动
+FLING_TAIL = 0.5            ###惯性滑动在抬手后继续统计0.5s的帧
+
+class TouchGestureDecoder:
+    """解码getevent -lt多点触控事件流(ABS_MT_SLOT/TRACKING_ID/POSITION, BTN_TOUCH), 切分为手势"""
+
+    def __init__(self):
+        self.gesture_id = 0
+        self.gesture = None
+        self.slot = 0
+        self.active_slots = {}      ###{slot: tracking id}, 手指全部抬起时为空
+        self.positions = {}         ###{slot: [x, y]}
+        self.btn_touch = None       ###None表示设备未上报BTN_TOUCH
+        self.uses_tracking_id = False
+
+    def feed(self, line):
+        """输入一行getevent输出, 返回(SYN_REPORT时间戳或None, 结束的手势或None)"""
+        match = TOUCH_LINE_PATTERN.match(line.strip())
+        if not match:
+            return None, None
+        report_time, code, value = float(match.group(1)), match.group(3), match.group(4)
+        if code == "ABS_MT_SLOT":
+            self.slot = int(value, 16)
+        elif code == "ABS_MT_TRACKING_ID":
+            self.uses_tracking_id = True
+            if value == "ffffffff":
+                self.active_slots.pop(self.slot, None)
+            else:
+                self.active_slots[self.slot] = int(value, 16)
+        elif code in ("ABS_MT_POSITION_X", "ABS_X"):
+            self.positions.setdefault(self.slot, [0, 0])[0] = int(value, 16)
+        elif code in ("ABS_MT_POSITION_Y", "ABS_Y"):
+            self.positions.setdefault(self.slot, [0, 0])[1] = int(value, 16)
+        elif code == "BTN_TOUCH":
+            self.btn_touch = value == "DOWN"
+        elif code == "SYN_REPORT":
+            return report_time, self.on_report(report_time)
+        return None, None
+
+    def is_touching(self):
+        if self.uses_tracking_id:
+            return bool(self.active_slots)
+        if self.btn_touch is not None:
+            return self.btn_touch
+        return True
+
+    def on_report(self, report_time):
+        finished = None
+        stateless = not self.uses_tracking_id and self.btn_touch is None
+        if self.gesture and stateless and report_time - self.gesture["end"] > TOUCH_GESTURE_GAP:
+            finished = self.finish()
+        if self.is_touching():
+            if self.gesture is None:
+                self.gesture_id += 1
+                slot = min(self.active_slots) if self.active_slots else self.slot
+                position = self.positions.get(slot, [0, 0])
+                self.gesture = {"id": self.gesture_id, "start": report_time, "end": report_time,
+                                "slot": slot, "start_pos": tuple(position), "max_distance": 0.0,
+                                "fingers": 1, "points": []}
+            self.track(report_time)
+        elif self.gesture:
+            self.track(report_time)
+            finished = self.finish()
+        return finished
+
+    def track(self, report_time):
+        """记录主手指(第一个按下的手指)轨迹, 只保留最近100ms的点用于计算抬手速度"""
+        gesture = self.gesture
+        gesture["end"] = report_time
+        gesture["fingers"] = max(gesture["fingers"], len(self.active_slots))
+        x, y = self.positions.get(gesture["slot"], gesture["start_pos"])
+        gesture["max_distance"] = max(gesture["max_distance"], math.hypot(x - gesture["start_pos"][0], y - gesture["start_pos"][1]))
+        gesture["points"].append((report_time, x, y))
+        while gesture["points"] and report_time - gesture["points"][0][0] > 0.1:
+            gesture["points"].pop(0)
+
+    def finish(self):
+        """结束当前手势, 判断手势类型: tap / long_press / swipe(含惯性滑动尾巴)"""
+        gesture = self.gesture
+        self.gesture = None
+        duration = gesture["end"] - gesture["start"]
+        points = gesture.pop("points")
+        velocity = 0.0
+        if len(points) > 1 and points[-1][0] > points[0][0]:
+            velocity = math.hypot(points[-1][1] - points[0][1], points[-1][2] - points[0][2]) / (points[-1][0] - points[0][0])
+        if gesture["max_distance"] < TAP_SLOP:
+            gesture["kind"] = "tap" if duration < TAP_TIMEOUT else "long_press"
+        else:
+            gesture["kind"] = "swipe"
+        gesture["velocity"] = velocity
+        gesture["fling_tail"] = FLING_TAIL if gesture["kind"] == "swipe" and velocity >= FLING_MIN_VELOCITY else 0.0
+        return gesture
+
 def monitor_touch_events(event_type):
     global touchNum,touch_process
     # 使用ADB命令监控触摸事件
     command = ["adb", "shell", "getevent", "-lt",event_type]
     touch_process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    decoder = TouchGestureDecoder()
     try:
         for line in iter(touch_process.stdout.readline, ''):
-                if line and "SYN_REPORT" in line:
+                if not line:
+                    continue
+                report_time, gesture = decoder.feed(line)
+                if report_time is not None:
                     # 处理并输出触摸事件数据
                     # log_message("Touch Event: ", line.strip())
                     touchNum = touchNum + 1
+                    ###交给监控线程与帧数据匹配, 时间戳换算为纳秒
+                    touch_event_queue.put((report_time * 1000000000, decoder.gesture_id))
+                if gesture:
+                    gesture_queue.put((gesture, time.time()))
     except KeyboardInterrupt:# 捕获Ctrl+C中断信号
         log_message("Stopping touch event monitor.")
     finally:
         touch_process.stdout.close()
         touch_process.stderr.close()
         touch_process.kill()
+
+TOUCH_LATENCY_MAX_MS = 1000     ###超过1s才出帧视为该触摸没有触发刷新, 不计入延迟
+TOUCH_PENDING_LIMIT = 2000      ###界面长时间不刷新时, 最多缓存的未匹配触摸事件数
+
+def update_touch_latency(frames, columns):
+    """将触摸事件匹配到其后第一个vsync的帧, 统计触摸到出帧的延迟(ms), 还没有这样的帧时留到下一个tick"""
+    global pending_touch_events
+    while not touch_event_queue.empty():
+        pending_touch_events.append(touch_event_queue.get_nowait())
+    del pending_touch_events[:-TOUCH_PENDING_LIMIT]
+    if len(frames) == 0 or not pending_touch_events or "FrameCompleted" not in columns:
+        return
+
+    ###触摸在其后第一个vsync开始的帧中处理: 匹配IntendedVsync不早于触摸时间的第一帧
+    order = np.argsort(frames[:, columns["IntendedVsync"]])
+    frame_vsync = frames[order, columns["IntendedVsync"]]
+    frame_end = frames[order, columns["FrameCompleted"]]
+
+    touch_times = np.array([event[0] for event in pending_touch_events])
+    indices = np.searchsorted(frame_vsync, touch_times, side='left')
+    matched = indices < len(frame_vsync)
+    latencies = np.full(len(touch_times), np.nan)
+    latencies[matched] = (frame_end[indices[matched]] - touch_times[matched]) / 1000000
+    latencies[latencies > TOUCH_LATENCY_MAX_MS] = np.nan
+
+    for (_, gesture_id), latency, is_matched in zip(pending_touch_events, latencies, matched):
+        if is_matched and not np.isnan(latency):
+            gesture_latencies.setdefault(gesture_id, []).append(float(latency))
+    touch_latency_hist.add(latencies[~np.isnan(latencies)])
+    ###尚未出帧的触摸事件留到下一个tick继续匹配
+    pending_touch_events = [event for event, is_matched in zip(pending_touch_events, matched) if not is_matched]
+    finish_gesture_latencies()
+
+def finish_gesture_latencies(final=False):
+    """没有待匹配事件的已结束手势, 输出该手势的触摸延迟分布; final为True时(停止监控)输出包括最后一个手势在内的全部手势"""
+    if not gesture_latencies:
+        return
+    pending_gestures = {gesture_id for _, gesture_id in pending_touch_events}
+    latest_gesture = max(gesture_latencies)
+    for gesture_id in sorted(gesture_latencies):
+        if not final and (gesture_id == latest_gesture or gesture_id in pending_gestures):
+            continue
+        values = np.array(gesture_latencies.pop(gesture_id))
+        p50, p95 = np.percentile(values, [50, 95])
+        log_message(f"Gesture #{gesture_id} touch-to-frame latency: {len(values)} events, p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {values.max():.1f} ms")
     
+GESTURE_FRAME_HISTORY = 10      ###缓存最近10s的帧, 用于手势结束后回溯统计
+GESTURE_SETTLE_TIME = 2         ###手势结束2s后界面仍未出帧也不再等待
+
+def update_gesture_frames(frames, columns):
+    """缓存最近的帧, 手势(含惯性滑动尾巴)结束后只统计手势窗口内的帧的FPS和卡顿"""
+    global recent_frames, recent_frame_columns, pending_gestures
+    while not gesture_queue.empty():
+        pending_gestures.append(gesture_queue.get_nowait())
+    if len(frames) > 0:
+        if recent_frame_columns != columns:
+            recent_frames = np.empty((0, len(columns)))
+            recent_frame_columns = columns
+        recent_frames = np.concatenate((recent_frames, frames))
+        intended_vsync = recent_frames[:, columns["IntendedVsync"]]
+        recent_frames = recent_frames[intended_vsync >= intended_vsync[-1] - GESTURE_FRAME_HISTORY * 1000000000]
+    if not pending_gestures or not recent_frame_columns:
+        return
+
+    intended_vsync = recent_frames[:, recent_frame_columns["IntendedVsync"]]
+    newest = intended_vsync[-1] if len(intended_vsync) else 0
+    still_pending = []
+    for gesture, received in pending_gestures:
+        window_start = gesture["start"] * 1000000000
+        window_end = (gesture["end"] + gesture["fling_tail"]) * 1000000000
+        if newest < window_end and time.time() - received < gesture["fling_tail"] + GESTURE_SETTLE_TIME:
+            still_pending.append((gesture, received))
+            continue
+        mask = (intended_vsync >= window_start) & (intended_vsync <= window_end)
+        report_gesture_frames(gesture, recent_frames[mask], recent_frame_columns)
+    pending_gestures = still_pending
+
+def report_gesture_frames(gesture, frames, columns):
+    """输出单个手势窗口内的FPS/卡顿, 滑动手势同时更新scroll_fps"""
+    global scroll_fps, scroll_janky
+    duration = (gesture["end"] - gesture["start"]) * 1000
+    window = f"{duration:.0f} ms" + (f" (+fling {gesture['fling_tail'] * 1000:.0f} ms)" if gesture["fling_tail"] else "")
+    if len(frames) == 0:
+        log_message(f"Gesture #{gesture['id']} {gesture['kind']} {window}: no frames")
+        return
+    gesture_fps = FPS_ALGORITHMS[fps_algorithm](frames, columns)
+    frame_times = frame_times_ms(frames, columns)
+    janky_count = int(np.count_nonzero(frame_times > VSYNC_PERIOD_MS))
+    FER = janky_count / len(frame_times) * 100
+    if gesture["kind"] == "swipe":
+        scroll_fps = gesture_fps
+        scroll_janky = FER
+    log_message(f"Gesture #{gesture['id']} {gesture['kind']} {window}, {gesture['fingers']} finger(s): {len(frames)} frames, FPS {gesture_fps:.2f}, Janky frames: {janky_count} ({FER:.2f}%)")
+
 def monitor_cpu():
     global cpu_process, cpu_usage, pid, cpu_counter
     # 使用CPU监控事件
@@ -484,7 +1956,7 @@ def monitor_cpu():
             lines = result.stdout.strip().splitlines()
             cleaned_list = [item for item in lines if item]
             for i in range(len(cleaned_list)):
-                if "TIME+ ARGS" in cleaned_list[i]:
+                if "TIME+ ARGS" in cleaned_list[i] and i + 1 < len(cleaned_list):
                     line = re.compile(r'\x1b\[.*?m').sub('', cleaned_list[i+1])
                     cpu_usage = float(line.split()[8])
                     ###用于观察图表数据是否有变化          
@@ -561,6 +2033,326 @@ def monitor_gpu():
         gpu_process.wait()
 
 
+###OpenMetrics导出: 设置环境变量MONITOR_IO_METRICS_PORT后启用, 供Prometheus抓取
+METRICS_PORT = os.environ.get("MONITOR_IO_METRICS_PORT")
+METRICS_ADDR = os.environ.get("MONITOR_IO_METRICS_ADDR", "127.0.0.1")
+METRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+METRICS_HIST_EDGES = FRAME_HIST_EDGES[::10]     ###导出时每1/4个十倍区间取一个桶边界
+metrics_snapshot = b"# EOF\n"
+
+def get_device_serial():
+    """Get the serial number of the connected device."""
+    result = subprocess.run(["adb", "get-serialno"], capture_output=True, text=True)
+    if result.returncode != 0:
+        return "unknown"
+    return result.stdout.strip()
+
+def format_metric_labels(labels):
+    """{key: value} -> key="value",... , 按OpenMetrics规则转义反斜杠和双引号"""
+    escaped = {key: str(value).replace('\\', '\\\\').replace('"', '\\"') for key, value in labels.items()}
+    return ",".join(f'{key}="{value}"' for key, value in escaped.items())
+
+def render_histogram_metric(name, help_text, hist, labels):
+    """将FrameTimeHistogram渲染为OpenMetrics histogram, le为毫秒"""
+    label_text = format_metric_labels(labels)
+    cumulative = np.cumsum(hist.counts)
+    lines = [f"# TYPE {name} histogram", f"# UNIT {name} milliseconds", f"# HELP {name} {help_text}"]
+    for edge in METRICS_HIST_EDGES:
+        ###桶i统计的是 [edges[i-1], edges[i]) 的帧, 即le=edges[i]的累计值为cumulative[i]
+        bucket_index = int(np.searchsorted(FRAME_HIST_EDGES, edge))
+        lines.append(f'{name}_bucket{{{label_text},le="{edge:.3f}"}} {int(cumulative[bucket_index])}')
+    lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {hist.total()}')
+    lines.append(f"{name}_count{{{label_text}}} {hist.total()}")
+    lines.append(f"{name}_sum{{{label_text}}} {hist.sum_value:.3f}")
+    return lines
+
+def publish_metrics(package_name):
+    """每个tick结束时由监控线程预先渲染好指标文本, 抓取时直接返回, 不访问设备也不等待采样"""
+    global metrics_snapshot
+    labels = {"device": device_serial, "package": package_name}
+    label_text = format_metric_labels(labels)
+    gauges = [
+        ("monitor_jank_percent", "Janky frame percentage of the last tick", janky_percent),
+        ("monitor_io_read_kbytes_per_second", "Storage read throughput of the package", read_bytes_sec),
+        ("monitor_io_write_kbytes_per_second", "Storage write throughput of the package", write_bytes_sec),
+        ("monitor_memory_pss_kbytes", "Total PSS of the package", pss_kb),
+        ("monitor_cpu_usage_percent", "CPU usage of the package from top", cpu_usage),
+        ("monitor_gpu_usage_percent", "GPU busy percentage", gpu),
+        ("monitor_touch_reports_per_second", "Touch SYN_REPORT rate", touch_rate),
+        ("monitor_io_rchar_kbytes_per_second", "Read throughput including page cache hits", io_rates["rchar_kb_s"]),
+        ("monitor_io_wchar_kbytes_per_second", "Write throughput including page cache", io_rates["wchar_kb_s"]),
+        ("monitor_io_read_syscalls_per_second", "Read syscalls per second", io_rates["syscr_s"]),
+        ("monitor_io_write_syscalls_per_second", "Write syscalls per second", io_rates["syscw_s"]),
+        ("monitor_io_cancelled_write_kbytes_per_second", "Cancelled write bytes rate", io_rates["cancelled_write_kb_s"]),
+        ("monitor_io_write_bytes_per_syscall", "Average bytes per write syscall", io_rates["write_bytes_per_syscall"]),
+        ("monitor_minor_faults_per_second", "Minor page faults of the package", fault_rates["minflt_s"]),
+        ("monitor_major_faults_per_second", "Major page faults of the package", fault_rates["majflt_s"]),
+        ("monitor_gc_pause_milliseconds", "GC pause time logged during the last tick", logcat_tick["gc_pause_ms"]),
+        ("monitor_skipped_frames", "Choreographer skipped frames logged during the last tick", logcat_tick["skipped_frames"]),
+    ]
+    disk_gauges = [
+        ("monitor_disk_iops", "Block device IO operations per second", lambda rates: rates["r_iops"] + rates["w_iops"]),
+        ("monitor_disk_read_kbytes_per_second", "Block device read throughput", lambda rates: rates["read_kb_s"]),
+        ("monitor_disk_write_kbytes_per_second", "Block device write throughput", lambda rates: rates["write_kb_s"]),
+        ("monitor_disk_queue_depth", "Average block device queue depth", lambda rates: rates["queue"]),
+        ("monitor_disk_await_milliseconds", "Average block device request latency", lambda rates: rates["await_ms"]),
+        ("monitor_disk_utilization_percent", "Block device busy percentage", lambda rates: rates["util"]),
+    ]
+    lines = ["# TYPE monitor_fps gauge", "# HELP monitor_fps FPS of the last tick per algorithm"]
+    for name, value in fps_results.items():
+        lines.append(f'monitor_fps{{{label_text},algorithm="{name}"}} {value:.3f}')
+    if scroll_fps is not None:
+        lines += ["# TYPE monitor_scroll_fps gauge", "# HELP monitor_scroll_fps FPS within the last swipe gesture",
+                  f"monitor_scroll_fps{{{label_text}}} {scroll_fps:.3f}"]
+    for name, help_text, value in gauges:
+        lines += [f"# TYPE {name} gauge", f"# HELP {name} {help_text}", f"{name}{{{label_text}}} {float(value):.3f}"]
+    sched_gauges = [
+        ("monitor_thread_run_milliseconds_per_second", "Time the thread spent running", "run_ms_s"),
+        ("monitor_thread_runqueue_milliseconds_per_second", "Time the thread spent runnable waiting for a CPU", "runq_ms_s"),
+        ("monitor_thread_runqueue_per_slice_milliseconds", "Average run-queue wait per timeslice", "runq_per_slice_ms"),
+        ("monitor_thread_voluntary_switches_per_second", "Voluntary context switches", "vcsw_s"),
+        ("monitor_thread_involuntary_switches_per_second", "Involuntary context switches", "ivcsw_s"),
+    ]
+    for name, help_text, key in sched_gauges:
+        lines += [f"# TYPE {name} gauge", f"# HELP {name} {help_text}"]
+        for rates in sched_rates.values():
+            lines.append(f"{name}{{{format_metric_labels({**labels, 'thread': rates['name']})}}} {float(rates[key]):.3f}")
+    ###同一指标族的样本必须紧跟在其TYPE/HELP之后
+    slope_lines, confidence_lines = [], []
+    for (metric, window), trend in leak_trends.items():
+        fit = trend.fit()
+        if fit and trend.n >= trend.min_samples:
+            trend_labels = format_metric_labels({**labels, "metric": metric, "window": format_window(window)})
+            slope_lines.append(f"monitor_memory_trend_slope_per_hour{{{trend_labels}}} {fit[0]:.3f}")
+            confidence_lines.append(f"monitor_memory_trend_confidence{{{trend_labels}}} {fit[3]:.4f}")
+    lines += ["# TYPE monitor_memory_trend_slope_per_hour gauge", "# HELP monitor_memory_trend_slope_per_hour Robust regression slope of memory metrics"]
+    lines += slope_lines
+    lines += ["# TYPE monitor_memory_trend_confidence gauge", "# HELP monitor_memory_trend_confidence Confidence that the memory metric is growing"]
+    lines += confidence_lines
+    for name, help_text, value in disk_gauges:
+        lines += [f"# TYPE {name} gauge", f"# HELP {name} {help_text}"]
+        for device, rates in disk_rates.items():
+            if device != "total":
+                lines.append(f"{name}{{{format_metric_labels({**labels, 'disk': device})}}} {float(value(rates)):.3f}")
+    lines += render_histogram_metric("monitor_frame_time_milliseconds", "Frame time of the session", frame_hist_session, labels)
+    lines += render_histogram_metric("monitor_touch_latency_milliseconds", "Touch-to-frame latency of the session", touch_latency_hist, labels)
+    lines.append("# EOF")
+    metrics_snapshot = ("\n".join(lines) + "\n").encode("utf-8")
+
+class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+    """只返回最近一次预渲染的指标快照"""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics_snapshot
+        self.send_response(200)
+        self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        ###不把每次抓取写入日志
+        pass
+
+def start_metrics_server(port=METRICS_PORT, address=METRICS_ADDR):
+    """启动OpenMetrics HTTP服务线程, 未配置端口时不启动"""
+    global metrics_server
+    if not port:
+        return None
+    try:
+        metrics_server = http.server.ThreadingHTTPServer((address, int(port)), MetricsRequestHandler)
+    except OSError as e:
+        ###端口被占用等情况下不导出指标, 监控照常运行
+        log_message(f"Could not serve metrics on {address}:{port}: {e}")
+        metrics_server = None
+        return None
+    metrics_thread = threading.Thread(target=metrics_server.serve_forever, name="metrics_Thread")
+    metrics_thread.daemon = True
+    metrics_thread.start()
+    log_message(f"Serving metrics on http://{address}:{port}/metrics")
+    return metrics_server
+
+###触发深度采集的条件, 为None的条件不启用
+DEEP_CAPTURE_TRIGGERS = {
+    "fps_below": 30,            ###本tick FPS低于30
+    "frame_time_above": 200,    ###本tick最长帧耗时超过200ms
+    "io_above": 20000,          ###读+写超过20000 kB/s
+}
+DEEP_CAPTURE_MIN_INTERVAL = 120     ###两次深度采集至少间隔120s
+DEEP_CAPTURE_TRACE_SECONDS = 3
+DEEP_CAPTURE_TRACE_CATEGORIES = "gfx input view wm am sched freq idle disk"
+deep_capture_enabled = False
+deep_capture_thread = None
+last_deep_capture = 0.0
+
+def parse_capture_trigger(value):
+    """命令行触发阈值, 0或off表示关闭该触发条件"""
+    if value.strip().lower() in ("off", "none"):
+        return None
+    threshold = float(value)
+    return threshold if threshold != 0 else None
+
+def check_deep_capture(package_name, timestamp, sample):
+    """检查触发条件, 满足且不在限频间隔内时在后台线程做一次深度采集"""
+    global deep_capture_thread, last_deep_capture
+    if not deep_capture_enabled or timestamp - last_deep_capture < DEEP_CAPTURE_MIN_INTERVAL:
+        return None
+    if deep_capture_thread and deep_capture_thread.is_alive():
+        return None
+    reasons = []
+    ###界面没有刷新的tick样本中没有fps, 只在本tick有新帧时判断FPS条件
+    if DEEP_CAPTURE_TRIGGERS["fps_below"] is not None and "fps" in sample and sample["fps"] < DEEP_CAPTURE_TRIGGERS["fps_below"]:
+        reasons.append(f"fps {sample['fps']:.1f}")
+    if DEEP_CAPTURE_TRIGGERS["frame_time_above"] is not None and max_frame_time > DEEP_CAPTURE_TRIGGERS["frame_time_above"]:
+        reasons.append(f"frame time {max_frame_time:.0f} ms")
+    if DEEP_CAPTURE_TRIGGERS["io_above"] is not None and sample["read_kb_s"] + sample["write_kb_s"] > DEEP_CAPTURE_TRIGGERS["io_above"]:
+        reasons.append(f"io {sample['read_kb_s'] + sample['write_kb_s']:.0f} kB/s")
+    if not reasons:
+        return None
+    last_deep_capture = timestamp
+    reason = ", ".join(reasons)
+    deep_capture_thread = threading.Thread(target=deep_capture, name="deep_capture_Thread", args=(package_name, pid, timestamp, reason, sample))
+    deep_capture_thread.daemon = True
+    deep_capture_thread.start()
+    return reason
+
+def deep_capture(package_name, capture_pid, timestamp, reason, sample):
+    """深度采集: 全部窗口framestats, 线程级CPU, meminfo, 短时间atrace, 保存在会话记录旁并在时间线上记录位置"""
+    base = os.path.splitext(session_path)[0] if session_path else os.path.join(LOG_DIR, current_time)
+    capture_dir = os.path.join(base + "_captures", time.strftime('%H_%M_%S', time.localtime(timestamp)))
+    os.makedirs(capture_dir, exist_ok=True)
+    log_message(f"[CAPTURE] {reason}, saving to {capture_dir}")
+    commands = [
+        ("framestats.txt", ["adb", "shell", f"dumpsys gfxinfo {package_name} framestats"]),
+        ("threads_cpu.txt", ["adb", "shell", f"top -H -b -n 1 -p {capture_pid}"]),
+        ("meminfo.txt", ["adb", "shell", f"dumpsys meminfo {package_name}"]),
+        ("trace.txt", ["adb", "exec-out", f"atrace -t {DEEP_CAPTURE_TRACE_SECONDS} -a {package_name} {DEEP_CAPTURE_TRACE_CATEGORIES}"]),
+    ]
+    files = []
+    for file_name, command in commands:
+        try:
+            result = subprocess.run(command, capture_output=True, timeout=DEEP_CAPTURE_TRACE_SECONDS + 30)
+        except subprocess.TimeoutExpired:
+            log_message(f"[CAPTURE] {file_name} timed out")
+            continue
+        with open(os.path.join(capture_dir, file_name), "wb") as capture_file:
+            capture_file.write(result.stdout)
+        files.append(file_name)
+    with open(os.path.join(capture_dir, "metrics.json"), "w", encoding="utf-8") as metrics_file:
+        json.dump({"time": timestamp, "reason": reason, "sample": sample}, metrics_file, indent=2)
+    record_session({"type": "capture", "time": timestamp, "message": reason, "path": capture_dir, "files": files})
+    log_message(f"[CAPTURE] done: {', '.join(files)}")
+
+ACTIVITY_LEAK_CYCLES = 5           ###离开并回到基准窗口5次后判定
+ACTIVITY_LEAK_GC_SETTLE = 1.0      ###发送SIGUSR1触发GC后等待1s再读取meminfo
+ACTIVITY_LEAK_TOLERANCE = {"Activities": 0, "Views": 50}    ###超过基准值多少才算未回落, View数量本身会有小幅波动
+activity_leak_enabled = False
+activity_leak = None
+
+class ActivityLeakTracker:
+    """Activity/View泄漏检测: 以第一次看到的本应用焦点窗口为基准窗口, 每次离开后再回到基准窗口时触发GC并保存meminfo快照,
+    回到N次后Activities/Views仍然每次都高于基准值则报告泄漏, 以及对象数增加的那几次往返中访问过的窗口"""
+
+    def __init__(self, package_name, cycles=None):
+        self.package_name = package_name
+        self.cycles = cycles or ACTIVITY_LEAK_CYCLES
+        self.home = None            ###基准窗口
+        self.baseline = None        ###基准窗口第一次的测量结果
+        self.away = []              ###本次离开基准窗口后依次访问的窗口
+        self.returns = []           ###每次回到基准窗口的测量结果
+        self.thread = None
+        base = os.path.splitext(session_path)[0] if session_path else os.path.join(LOG_DIR, current_time)
+        self.snapshot_dir = base + "_leaks"
+
+    def observe(self, window, timestamp):
+        """每个tick传入当前焦点窗口"""
+        if not window:
+            return
+        if self.home is None:
+            if self.package_name in window:
+                self.home = window
+                log_message(f"Activity leak check: baseline window {window}")
+                self.start_measure(timestamp, [])
+            return
+        if window != self.home:
+            if not self.away or self.away[-1] != window:
+                self.away.append(window)
+            return
+        if self.away:
+            visited, self.away = self.away, []
+            self.start_measure(timestamp, visited)
+
+    def start_measure(self, timestamp, visited):
+        if self.thread and self.thread.is_alive():
+            log_message("Activity leak check: previous measurement still running, round trip skipped")
+            return
+        self.thread = threading.Thread(target=self.measure, name="activity_leak_Thread", args=(timestamp, visited))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def measure(self, timestamp, visited):
+        """触发GC后读取meminfo, 原始输出保存在会话记录旁"""
+        subprocess.run(["adb", "shell", f"kill -10 {pid}"], capture_output=True)    ###SIGUSR1: ART执行一次GC
+        time.sleep(ACTIVITY_LEAK_GC_SETTLE)
+        result = subprocess.run(["adb", "shell", f"dumpsys meminfo {self.package_name}"], capture_output=True, text=True)
+        meminfo = parse_meminfo(result.stdout.splitlines())
+        if "Activities" not in meminfo or "Views" not in meminfo:
+            log_message("Activity leak check: no valid meminfo, round trip skipped")
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        label = "baseline" if self.baseline is None else f"trip{len(self.returns) + 1}"
+        path = os.path.join(self.snapshot_dir, f"{time.strftime('%H_%M_%S', time.localtime(timestamp))}_{label}.txt")
+        with open(path, "w", encoding="utf-8") as snapshot_file:
+            snapshot_file.write(result.stdout)
+        measurement = {"time": timestamp, "visited": visited, "path": path,
+                       "counts": {name: int(meminfo[name]) for name in ACTIVITY_LEAK_TOLERANCE}}
+        if self.baseline is None:
+            self.baseline = measurement
+            log_message(f"Activity leak check: baseline {format_object_counts(measurement['counts'])}")
+            return
+        self.returns.append(measurement)
+        log_message(f"Activity leak check: round trip {len(self.returns)}/{self.cycles} via {' -> '.join(visited)}: "
+                    f"{format_object_counts(measurement['counts'])} (baseline {format_object_counts(self.baseline['counts'])})")
+        if len(self.returns) >= self.cycles:
+            self.evaluate()
+            self.returns = []
+
+    def evaluate(self):
+        """对象数在每次回到基准窗口时都高于基准值则判定为泄漏, 统计对象数增加的往返中访问过的窗口"""
+        leaks = {}
+        for name, tolerance in ACTIVITY_LEAK_TOLERANCE.items():
+            counts = [measurement["counts"][name] for measurement in self.returns]
+            if min(counts) - self.baseline["counts"][name] <= tolerance:
+                continue
+            suspects = collections.Counter()
+            previous = self.baseline["counts"][name]
+            for measurement, count in zip(self.returns, counts):
+                if count > previous:
+                    suspects.update(set(measurement["visited"]))
+                previous = count
+            leaks[name] = {"baseline": self.baseline["counts"][name], "counts": counts,
+                           "per_trip": (counts[-1] - self.baseline["counts"][name]) / len(counts),
+                           "suspects": [window for window, _ in suspects.most_common()]}
+        report = {"time": time.time(), "home": self.home, "baseline": self.baseline, "returns": self.returns, "leaks": leaks}
+        report_path = os.path.join(self.snapshot_dir, f"report_{time.strftime('%H_%M_%S')}.json")
+        with open(report_path, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+        if not leaks:
+            log_message(f"Activity leak check: Activities/Views returned to baseline after {len(self.returns)} round trips")
+            return
+        for name, leak in leaks.items():
+            message = (f"{name} never returned to baseline {leak['baseline']} after {len(leak['counts'])} round trips to {self.home}: "
+                       f"{leak['counts']} ({leak['per_trip']:+.1f} per trip), suspects: {', '.join(leak['suspects']) or 'none'}")
+            log_message(f"[LEAK] {message}")
+            record_session({"type": "leak", "time": report["time"], "metric": name.lower(), "message": message,
+                            "path": report_path, "snapshots": [measurement["path"] for measurement in self.returns]})
+
+def format_object_counts(counts):
+    return ", ".join(f"{name} {count}" for name, count in counts.items())
+
 def start_monitor_thread(package_name, event_type, interval=0.5):
     global monitor_thread
     """启动监控线程"""
@@ -590,8 +2382,34 @@ def start_monitor_gpu_thread():
     gpu_thread.daemon = True
     gpu_thread.start()
 
+def start_monitor_focus_thread():
+    global focus_thread
+    """启动焦点窗口事件监控线程"""
+    focus_thread = threading.Thread(target=monitor_focus_events, name="focus_Thread")
+    focus_thread.daemon = True
+    focus_thread.start()
+
+def start_monitor_logcat_threads(package_name):
+    global logcat_threads
+    """启动logcat事件监控线程, 每路logcat一个线程"""
+    logcat_threads = []
+    for stream in LOGCAT_STREAMS:
+        thread = threading.Thread(target=monitor_logcat, name=f"logcat_{stream[0]}_Thread", args=(stream, package_name))
+        thread.daemon = True
+        thread.start()
+        logcat_threads.append(thread)
+
+def restart_logcat_streams():
+    """进程重启后结束按PID过滤的logcat, 由读取线程用新PID重连"""
+    for name, buffer, tags, by_pid in LOGCAT_STREAMS:
+        if by_pid and logcat_processes.get(name):
+            logcat_processes[name].kill()
+
 def start_to_Monitor(package_name, event_type, interval=0.5):
     global monitor,prev_timer,stop_threads,prev_meminfo_timer
+    global frame_hist_session,frame_hist_window,anomaly_detectors,system_io,leak_trends,activity_leak
+    global touch_latency_hist,pending_touch_events,gesture_latencies
+    global recent_frames,recent_frame_columns,pending_gestures,scroll_fps,scroll_janky
 
     devices_count = check_connect()
     if devices_count == 0 :
@@ -604,6 +2422,27 @@ def start_to_Monitor(package_name, event_type, interval=0.5):
     if not monitor:
         prev_timer = time.time()    ###记录IO初始时间
         prev_meminfo_timer = time.time()
+        frame_hist_session = FrameTimeHistogram()
+        frame_hist_window = RollingFrameTimeHistogram(window=60)    ###60个tick, 约30s
+        anomaly_detectors = create_anomaly_detectors()
+        leak_trends = create_leak_trends()
+        activity_leak = None
+        if system_io_enabled:
+            system_io = SystemIoTop()
+        touch_latency_hist = FrameTimeHistogram()
+        pending_touch_events = []
+        gesture_latencies = {}
+        while not touch_event_queue.empty():
+            touch_event_queue.get_nowait()
+        while not gesture_queue.empty():
+            gesture_queue.get_nowait()
+        while not logcat_event_queue.empty():
+            logcat_event_queue.get_nowait()
+        recent_frames = np.empty((0, 0))
+        recent_frame_columns = {}
+        pending_gestures = []
+        scroll_fps = None
+        scroll_janky = None
         stop_threads = False
         start_monitor_thread(package_name,event_type,interval)
     else:
@@ -611,6 +2450,7 @@ def start_to_Monitor(package_name, event_type, interval=0.5):
 
 def kill_thread():
     global monitor_thread, touch_thread, cpu_thread, gpu_thread, stop_threads, monitor, touch_process, pid, gpu
+    global focus_thread, focus_process
     stop_threads = True
     if monitor_thread and monitor_thread.is_alive():
         monitor_thread.join()
@@ -621,12 +2461,61 @@ def kill_thread():
         cpu_thread.join()
     if gpu_thread and gpu_thread.is_alive():
         gpu_thread.join()
+    if focus_thread and focus_thread.is_alive():
+        if focus_process:
+            focus_process.kill()
+        focus_thread.join()
+    for process in logcat_processes.values():
+        process.kill()
+    for thread in logcat_threads:
+        thread.join()
+    logcat_processes.clear()
     monitor = False
     pid = ""
     gpu = 0.00
+    finish_gesture_latencies(final=True)
+    if frame_hist_session.total() > 0:
+        log_message(f"Session frame time p50/p90/p95/p99/max: {format_frame_percentiles(frame_hist_session)} ({frame_hist_session.total()} frames)")
+        record_session({"type": "histogram", "time": time.time(), "name": "frame_time", "hist": frame_hist_session.to_dict()})
+    if touch_latency_hist.total() > 0:
+        record_session({"type": "histogram", "time": time.time(), "name": "touch_latency", "hist": touch_latency_hist.to_dict()})
+    for (metric, window), trend in leak_trends.items():
+        fit = trend.fit()
+        if fit and trend.n >= trend.min_samples:
+            name, unit, _ = LEAK_METRICS[metric]
+            log_message(f"Memory trend {name} over {format_window(window)}: {fit[0]:+.1f} {unit}/h (confidence {fit[3] * 100:.1f}%)")
     log_message("Monitoring stopped.")
 
 
+def set_deep_capture(enabled):
+    global deep_capture_enabled
+    deep_capture_enabled = enabled
+
+def set_system_io(enabled):
+    global system_io_enabled, system_io
+    if enabled and not system_io_enabled:
+        system_io = SystemIoTop()
+    system_io_enabled = enabled
+
+def set_per_thread(enabled):
+    global per_thread_enabled
+    per_thread_enabled = enabled
+
+def set_activity_leak(enabled):
+    global activity_leak_enabled
+    activity_leak_enabled = enabled
+
+def set_chart_zoom(level):
+    global chart_zoom
+    chart_zoom = level
+    ###监控停止后定时刷新不再重绘图表, 直接用已缓存的数据重绘
+    if canvas is not None:
+        if chart_zoom != "raw":
+            draw_zoomed_charts()
+        else:
+            draw_raw_charts()
+        canvas.draw()
+
 def open_root():
     global root, log_text, chart_frame, canvas, pid
 
@@ -691,16 +2580,91 @@ def open_root():
     clear_button = Button(root, text="清空日志", command=lambda: clear_text(log_text))
     clear_button.grid(row=3, column=2, sticky=NSEW, padx=10, pady=10)
 
+    # 启动耗时基准测试: 模式, 次数, 是否清理页缓存
+    bench_frame = Frame(root)
+    bench_frame.grid(row=6, column=0, columnspan=3, sticky=NW, padx=10, pady=10)
+
+    Label(bench_frame, text="startup mode:").grid(row=0, column=0, sticky=NW)
+    box5 = ttk.Combobox(bench_frame, width=8, state="readonly")
+    box5['values'] = STARTUP_MODES
+    box5.current(0)
+    box5.grid(row=0, column=1, sticky=NW, padx=10)
+
+    Label(bench_frame, text="iterations:").grid(row=0, column=2, sticky=NW)
+    iterations_box = Spinbox(bench_frame, from_=1, to=100, width=5)
+    iterations_box.delete(0, END)
+    iterations_box.insert(0, "10")
+    iterations_box.grid(row=0, column=3, sticky=NW, padx=10)
+
+    drop_caches_var = BooleanVar(value=False)
+    Checkbutton(bench_frame, text="drop caches", variable=drop_caches_var).grid(row=0, column=4, sticky=NW, padx=10)
+
+    bench_button = Button(bench_frame, text="启动耗时测试", command=lambda: start_startup_benchmark_thread(box3.get(), box5.get(), iterations_box.get(), drop_caches_var.get()))
+    bench_button.grid(row=0, column=5, sticky=NW, padx=10)
+
+    capture_button = Button(bench_frame, text="启动过程采样", command=lambda: start_startup_capture_thread(box3.get()))
+    capture_button.grid(row=0, column=6, sticky=NW, padx=10)
+
+    deep_capture_var = BooleanVar(value=deep_capture_enabled)
+    Checkbutton(bench_frame, text="deep capture on anomaly", variable=deep_capture_var,
+                command=lambda: set_deep_capture(deep_capture_var.get())).grid(row=0, column=7, sticky=NW, padx=10)
+    system_io_var = BooleanVar(value=system_io_enabled)
+    Checkbutton(bench_frame, text="system IO top", variable=system_io_var,
+                command=lambda: set_system_io(system_io_var.get())).grid(row=0, column=8, sticky=NW, padx=10)
+    per_thread_var = BooleanVar(value=per_thread_enabled)
+    Checkbutton(bench_frame, text="per-thread", variable=per_thread_var,
+                command=lambda: set_per_thread(per_thread_var.get())).grid(row=0, column=9, sticky=NW, padx=10)
+    activity_leak_var = BooleanVar(value=activity_leak_enabled)
+    Checkbutton(bench_frame, text="activity leak", variable=activity_leak_var,
+                command=lambda: set_activity_leak(activity_leak_var.get())).grid(row=0, column=10, sticky=NW, padx=10)
+
+    # 图表时间粒度下拉框
+    label4 = Label(root, text="chart zoom:")
+    label4.grid(row=3, column=0, sticky=NW, padx=10, pady=10)
+
+    box4 = ttk.Combobox(root, width=50, state="readonly")
+    box4['values'] = ("raw",) + tuple(name for name, _, _ in ROLLUP_LEVELS)
+    box4.current(0)
+    box4.grid(row=3, column=1, sticky=NW, padx=10, pady=10)
+    box4.bind("<<ComboboxSelected>>", lambda event: set_chart_zoom(box4.get()))
+
     # 创建柱状图标签
     chart_frame = ttk.Frame(root)
     chart_frame.grid(row=0, column=3, rowspan=6, sticky=NS, padx=10, pady=10)
 
+    # 全系统IO排行表, 显示在IO图表旁
+    global io_top_tree
+    Label(chart_frame, text="top IO processes (kB/s)").grid(row=0, column=0, sticky=NW)
+    io_top_tree = ttk.Treeview(chart_frame, columns=("pid", "name", "read", "write"), show="headings", height=SYSTEM_IO_TOP_N)
+    for column, heading, width in (("pid", "PID", 50), ("name", "process", 120), ("read", "read", 60), ("write", "write", 60)):
+        io_top_tree.heading(column, text=heading)
+        io_top_tree.column(column, width=width, anchor=W if column == "name" else E)
+    io_top_tree.tag_configure("monitored", background="#ffe9a8")
+    io_top_tree.grid(row=1, column=0, sticky=NW)
+
+    # 线程级缺页排行表
+    global fault_tree
+    Label(chart_frame, text="thread page faults (/s)").grid(row=2, column=0, sticky=NW, pady=(10, 0))
+    fault_tree = ttk.Treeview(chart_frame, columns=("tid", "name", "minor", "major"), show="headings", height=PER_THREAD_TOP_N)
+    for column, heading, width in (("tid", "TID", 50), ("name", "thread", 120), ("minor", "minor", 60), ("major", "major", 60)):
+        fault_tree.heading(column, text=heading)
+        fault_tree.column(column, width=width, anchor=W if column == "name" else E)
+    fault_tree.grid(row=3, column=0, sticky=NW)
+
     canvas = None
     canvas = plot_canvas(root)
     update_metrics()    # 更新图表
 
     process_log_queue()  # 启动处理日志队列的定时器
 
+    root.update()
+    log_message(f"Time to first window: {time.perf_counter() - PROCESS_START:.3f} s")
+    if first_window_benchmark:
+        ###--first-window-benchmark: 显示首个窗口后立即退出, 由run_import_benchmark统计耗时
+        print(f"first_window {time.perf_counter() - PROCESS_START:.3f}")
+        root.destroy()
+        return
+
 
     root.mainloop()
 
@@ -708,10 +2672,14 @@ def monitor_io_and_fps(package_name,event_type,interval=0.5):
     global touchNum,monitor,chart_frame,pid
     global read_bytes_sec,write_bytes_sec,fps,cpu_usage ###绘图全局变量
     global prev_timer,prev_meminfo_timer,memory_io
-    global io_counter
+    global io_counter,pss_kb,touch_rate,device_serial,io_rates,disk_rates,sched_rates
+    global fault_rates,thread_fault_rates,activity_leak,logcat_tick
 
     """Monitor the IO throughput and FPS of the given package name."""
-    pid = get_pid(package_name)
+    global pid_start_time,process_restarts
+    pid = resolve_pid(package_name)
+    pid_start_time = None
+    process_restarts = 0
     if pid == "" :
         log_message(f"Could not find PID for package: {package_name}")
         return
@@ -728,16 +2696,26 @@ def monitor_io_and_fps(package_name,event_type,interval=0.5):
         return 
 	
     log_message(f"Monitoring IO and FPS for {package_name} (PID: {pid}, Window: {window_name})")
-    prev_io_stats = get_io_stats(pid)
+    device_serial = get_device_serial()
+    snapshot = get_proc_snapshot(package_name, pid)
+    prev_io_stats = parse_io_lines(snapshot["io"])
+    prev_diskstats = parse_diskstats(snapshot["diskstats"])
+    prev_threads = parse_thread_stats(snapshot)
+    prev_faults = parse_fault_counts(snapshot["stat"][0]) if snapshot["stat"] else (0, 0)
+    prev_thread_faults = parse_thread_faults(snapshot.get("task_stat", []))
     if not prev_io_stats:
         log_message(f"Could not get IO stats for PID: {pid}")
         return
+    track_process(package_name, snapshot)
 
     ###确保主进程满足条件后再启动子线程
     start_monitor_touch_events_thread(event_type)
     start_monitor_cpu_thread()
     start_monitor_gpu_thread()
+    start_monitor_focus_thread()
+    start_monitor_logcat_threads(package_name)
 
+    first_sample = True
     while True:
         if stop_threads:
             break
@@ -753,26 +2731,79 @@ def monitor_io_and_fps(package_name,event_type,interval=0.5):
         time.sleep(interval)
         log_message(time.strftime('%H:%M:%S', time.localtime()))
 
-        current_focus_window = get_current_focus_window()
+        current_focus_window = get_tracked_focus_window()
         if not current_focus_window:
             log_message(f"Could not find the current focus window ")
         else:
             log_message(f"The current focus window: {current_focus_window}")
+        if activity_leak_enabled:
+            if activity_leak is None or activity_leak.package_name != package_name:
+                activity_leak = ActivityLeakTracker(package_name)
+            activity_leak.observe(current_focus_window, time.time())
 
-        current_io_stats = get_io_stats(pid)
+        snapshot = get_proc_snapshot(package_name, pid)
         current_timer = time.time()
-        if not current_io_stats:
-            log_message(f"Could not get IO stats for PID: {pid}")
-            return
+        interval_time = (current_timer - prev_timer)
+        process_state = track_process(package_name, snapshot)
+        if process_state == "restarted":
+            ###新进程的计数器从0开始, 重新取基线, 本tick的速率记为0并在时间线上标记断点
+            snapshot = get_proc_snapshot(package_name, pid)
+            track_process(package_name, snapshot)
+            record_session({"type": "restart", "time": current_timer, "message": f"PID {pid}", "pid": pid})
+            restart_logcat_streams()
+            window_name = get_foreground_window_name(package_name)
+            log_message(f"Monitoring IO and FPS for {package_name} (PID: {pid}, Window: {window_name})")
+        current_io_stats = parse_io_lines(snapshot["io"])
+        current_faults = parse_fault_counts(snapshot["stat"][0]) if snapshot["stat"] else prev_faults
+        if process_state == "missing" or not current_io_stats:
+            log_message(f"Could not get IO stats for PID: {pid}, waiting for {package_name} to restart")
+            current_io_stats = prev_io_stats
+            current_faults = prev_faults
+        elif process_state == "restarted":
+            prev_io_stats = current_io_stats
+            prev_faults = current_faults
 
         read_bytes_diff = current_io_stats.get("read_bytes", 0) - prev_io_stats.get("read_bytes", 0)
         write_bytes_diff = current_io_stats.get("write_bytes", 0) - prev_io_stats.get("write_bytes", 0)
-        interval_time = (current_timer - prev_timer)
         read_bytes_sec = (read_bytes_diff / interval_time) / 1024
         write_bytes_sec = (write_bytes_diff / interval_time) / 1024
+        io_rates = get_io_rates(prev_io_stats, current_io_stats, interval_time)
         prev_io_stats = current_io_stats
         prev_timer = current_timer
         log_message(f"Read: {read_bytes_sec:.1f} kBytes/s, Write: {write_bytes_sec:.1f} kBytes/s")
+        log_message(f"IO calls: rchar {io_rates['rchar_kb_s']:.1f} kB/s, wchar {io_rates['wchar_kb_s']:.1f} kB/s, "
+                    f"syscr {io_rates['syscr_s']:.0f}/s, syscw {io_rates['syscw_s']:.0f}/s, "
+                    f"avg {io_rates['read_bytes_per_syscall']:.0f}/{io_rates['write_bytes_per_syscall']:.0f} B per read/write call, "
+                    f"cancelled write {io_rates['cancelled_write_kb_s']:.1f} kB/s")
+        if io_rates["syscw_s"] > SMALL_WRITE_SYSCALLS and io_rates["write_bytes_per_syscall"] < SMALL_WRITE_BYTES:
+            log_message(f"[IO] small-write storm: {io_rates['syscw_s']:.0f} writes/s, {io_rates['write_bytes_per_syscall']:.0f} B per write")
+        ###块设备层面的IOPS/延迟, 与本进程的IO和FPS下降对照
+        current_diskstats = parse_diskstats(snapshot["diskstats"])
+        disk_rates = get_disk_rates(prev_diskstats, current_diskstats, interval_time)
+        if current_diskstats:
+            prev_diskstats = current_diskstats
+        for device, rates in disk_rates.items():
+            if device != "total" and (rates["r_iops"] > 0 or rates["w_iops"] > 0):
+                log_message(f"Disk {format_disk_rates(device, rates)}")
+        ###缺页速率, 线程级模式下同时统计每个线程
+        fault_rates = get_fault_rates(prev_faults, current_faults, interval_time)
+        prev_faults = current_faults
+        log_message(f"Page faults: {format_fault_rates(fault_rates)}")
+        current_thread_faults = parse_thread_faults(snapshot.get("task_stat", []))
+        thread_fault_rates = get_thread_fault_rates(prev_thread_faults, current_thread_faults, interval_time) if per_thread_enabled else []
+        prev_thread_faults = current_thread_faults
+        if thread_fault_rates:
+            log_message("Thread page faults: " + "; ".join(f"{item['name']}({item['tid']}) {format_fault_rates(item)}" for item in thread_fault_rates[:5]))
+        ###主线程/RenderThread的运行队列等待和上下文切换, 解释没有CPU占用的卡顿
+        current_threads = parse_thread_stats(snapshot)
+        sched_rates = key_thread_rates(get_sched_rates(prev_threads, current_threads, interval_time), pid)
+        prev_threads = current_threads
+        if sched_rates:
+            log_message("Sched " + "; ".join(format_sched_rates(rates) for rates in sched_rates.values()))
+        if system_io_enabled and system_io:
+            system_io.update(snapshot, current_timer)
+            if system_io.top:
+                log_message(f"Top IO (kB/s): {format_system_io_top(system_io.top)}")
         ###用于观察图表数据是否有变化          
         io_counter += 1
         if io_counter == 100:
@@ -786,8 +2817,16 @@ def monitor_io_and_fps(package_name,event_type,interval=0.5):
         if not meminfo:
             log_message(f"No vaild Memory info")
         else:
+            pss_kb = int(meminfo['TOTAL PSS'])
             log_message(f"Memory Usage infomation\tTotal PSS:{(int(meminfo['TOTAL PSS'])/1024):.1f} MB,\t\tTotal RSS:{(int(meminfo['TOTAL RSS'])/1024):.1f} MB,\t\tViews:{meminfo['Views']},\t\tActivities:{meminfo['Activities']}")
             memory_io = (int(meminfo['meminfo_io'])/interval_meminfo_time)
+            update_leak_trends(current_meminfo_timer, {
+                "pss_kb": pss_kb,
+                "java_heap_kb": int(meminfo["Java Heap"]) if "Java Heap" in meminfo else None,
+                "native_heap_kb": int(meminfo["Native Heap"]) if "Native Heap" in meminfo else None,
+                "views": int(meminfo["Views"]) if "Views" in meminfo else None,
+                "activities": int(meminfo["Activities"]) if "Activities" in meminfo else None,
+            })
             log_message(f"Memory Usage throughput {memory_io:.1f} KB/s")
 
 
@@ -796,6 +2835,14 @@ def monitor_io_and_fps(package_name,event_type,interval=0.5):
             log_message(f"FPS: N/A,{janky_frames}")
         else:
             log_message(f"FPS: {fps:.2f},{janky_frames}")
+            if len(fps_results) > 1:
+                log_message(f"FPS algorithms: {format_fps_results()}")
+        if frame_stages:
+            log_message(format_frame_stages(frame_stages, frame_bottleneck))
+        if frame_hist_session.total() > 0:
+            log_message(f"Frame time p50/p90/p95/p99/max: window {format_frame_percentiles(frame_hist_window)}, session {format_frame_percentiles(frame_hist_session)}")
+        if touch_latency_hist.total() > 0:
+            log_message(f"Touch-to-frame latency p50/p90/p95/p99/max: {format_frame_percentiles(touch_latency_hist)}")
         
         ###CPU
         log_message(f"{package_name} CPU usage:{cpu_usage:.2f}%")
@@ -804,17 +2851,329 @@ def monitor_io_and_fps(package_name,event_type,interval=0.5):
             log_message(f"Waiting for GPU info")
         else:
             log_message(f"GPU usage:{gpu:.2f}%")
+        logcat_tick = drain_logcat_events()
+        if logcat_tick["gc_count"] or logcat_tick["skipped_frames"]:
+            log_message(f"GC: {logcat_tick['gc_count']} collections, {logcat_tick['gc_pause_ms']:.1f} ms paused, skipped frames: {logcat_tick['skipped_frames']}")
         log_message(f"Monitor: {touchNum} CPS\n")
+        touch_rate = touchNum / interval_time
         touchNum = 0 # 重置touchNum
-
-def set_logging():
+        ###本tick没有新帧时fps/jank没有意义, 不放入样本, 避免静止画面触发FPS异常或拉低汇总
+        frame_sample = {"fps": fps, "jank": janky_percent} if new_frame_count > 0 else {}
+        sample = {**frame_sample, "read_kb_s": read_bytes_sec, "write_kb_s": write_bytes_sec,
+                  "pss_kb": pss_kb, "cpu": cpu_usage, "gpu": gpu, "touch_rate": touch_rate, **io_rates,
+                  **{f"disk_{key}": value for key, value in disk_rates["total"].items()},
+                  **{f"{role}_{key}": rates[key] for role, rates in sched_rates.items() for key in SCHED_RATE_KEYS},
+                  **fault_rates, **logcat_tick}
+        record_rollups(current_timer, sample)
+        detect_anomalies(current_timer, sample)
+        check_deep_capture(package_name, current_timer, sample)
+        record_session({"type": "sample", "time": current_timer, **sample, "fps_results": fps_results,
+                        **({"system_io_top": system_io.top} if system_io_enabled and system_io else {}),
+                        **({"thread_faults": thread_fault_rates} if per_thread_enabled else {})})
+        publish_metrics(package_name)
+        if first_sample:
+            log_message(f"Time to first sample: {time.perf_counter() - PROCESS_START:.3f} s")
+            first_sample = False
+
+def run_headless(package_name, event_type, interval=0.5):
+    """无界面模式: 不创建tkinter窗口也不导入matplotlib, 日志输出到控制台和日志文件, Ctrl+C停止"""
+    global gui_enabled, log_to_console
+    gui_enabled = False
+    log_to_console = True
+    start_to_Monitor(package_name, event_type, interval)
+    try:
+        while monitor_thread and monitor_thread.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    kill_thread()
+
+def run_import_benchmark(runs=5):
+    """对比导入/首个窗口耗时: 各启动runs个新的Python进程, 取中位数"""
+    script = os.path.abspath(__file__)
+    script_dir = os.path.dirname(script)
+
+    def measure(command):
+        start = time.perf_counter()
+        result = subprocess.run(command, capture_output=True, text=True, cwd=script_dir)
+        return time.perf_counter() - start, result.stdout
+
+    interpreter = statistics.median(measure([sys.executable, "-c", "pass"])[0] for _ in range(runs))
+    headless_import = statistics.median(measure([sys.executable, "-c", "import monitor_io"])[0] for _ in range(runs))
+    pyplot_import = statistics.median(measure([sys.executable, "-c", "import monitor_io, matplotlib.pyplot"])[0] for _ in range(runs))
+    loaded = measure([sys.executable, "-c", "import sys, monitor_io; print(sorted(m for m in ('matplotlib', 'matplotlib.pyplot') if m in sys.modules))"])[1].strip()
+    print(f"python interpreter:            {interpreter * 1000:.0f} ms")
+    print(f"import monitor_io (headless):  {(headless_import - interpreter) * 1000:.0f} ms, matplotlib modules loaded: {loaded}")
+    print(f"  + matplotlib.pyplot (old):   {(pyplot_import - interpreter) * 1000:.0f} ms")
+    windows = []
+    for _ in range(runs):
+        elapsed, output = measure([sys.executable, script, "--first-window-benchmark"])
+        for line in output.splitlines():
+            if line.startswith("first_window "):
+                windows.append(float(line.split()[1]))
+    if windows:
+        print(f"time to first window:          {statistics.median(windows) * 1000:.0f} ms")
+    else:
+        print("time to first window:          N/A (no display)")
+
+###报告中的曲线: (文件名, 标题, y轴, [(指标名, 图例)])
+REPORT_CHARTS = [
+    ("fps", "FPS", "fps", [("fps", "fps")]),
+    ("jank", "Janky frames", "%", [("jank", "jank")]),
+    ("io", "IO throughput", "kB/s", [("read_kb_s", "read"), ("write_kb_s", "write")]),
+    ("io_calls", "IO syscalls", "calls/s", [("syscr_s", "read"), ("syscw_s", "write")]),
+    ("gc", "GC pauses and skipped frames", "ms / frames", [("gc_pause_ms", "GC pause"), ("skipped_frames", "skipped frames")]),
+    ("faults", "Page faults", "faults/s", [("minflt_s", "minor"), ("majflt_s", "major")]),
+    ("runqueue", "Run-queue delay", "ms/s", [("main_runq_ms_s", "main"), ("render_runq_ms_s", "RenderThread")]),
+    ("disk", "Block device latency", "ms", [("disk_await_ms", "await"), ("disk_svctm_ms", "svctm")]),
+    ("memory", "Total PSS", "MB", [("pss_mb", "PSS")]),
+    ("cpu", "CPU usage", "%", [("cpu", "cpu")]),
+    ("gpu", "GPU usage", "%", [("gpu", "gpu")]),
+]
+REPORT_MARKER_CHARTS = {"fps", "jank", "gc"}
+REPORT_MARKER_COLORS = {"gc": "tab:purple", "gc_wait": "tab:purple", "skipped_frames": "tab:orange", "slow_looper": "tab:brown", "anr": "red"}
+REPORT_MAX_POINTS = 2000    ###每条曲线最多绘制的点数, 更长的会话按区间取均值/最小/最大值
+
+def load_session(path):
+    """读取会话记录文件, 返回 {"time": 数组, "metrics": {指标名: 数组}, "events": [...], "histograms": {...}}"""
+    samples = []
+    events = []
+    histograms = {}
+    with open(path, encoding='utf-8') as session_file:
+        for line in session_file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["type"] == "sample":
+                samples.append(record)
+            elif record["type"] == "histogram":
+                hist = FrameTimeHistogram.from_dict(record["hist"])
+                if record["name"] in histograms:
+                    hist.merge(histograms[record["name"]])
+                histograms[record["name"]] = hist
+            else:
+                events.append(record)
+    times = np.array([sample["time"] for sample in samples], dtype=np.float64)
+    names = {name for sample in samples for name, value in sample.items() if isinstance(value, (int, float)) and name != "time"}
+    metrics = {name: np.array([sample.get(name, np.nan) for sample in samples], dtype=np.float64) for name in names}
+    if "pss_kb" in metrics:
+        metrics["pss_mb"] = np.where(metrics["pss_kb"] > 0, metrics["pss_kb"] / 1024, np.nan)
+    return {"time": times, "metrics": metrics, "events": events, "histograms": histograms}
+
+def summarize_session(session):
+    """向量化计算会话的汇总统计"""
+    times = session["time"]
+    metrics = session["metrics"]
+    summary = {"samples": len(times), "duration_s": float(times[-1] - times[0]) if len(times) > 1 else 0.0}
+    if len(times) > 1:
+        dt = np.diff(times, prepend=times[0] - np.median(np.diff(times)))
+    else:
+        dt = np.ones(len(times))
+    for name in ("gc_pause_ms", "skipped_frames", "anr"):
+        if name in metrics:
+            summary[f"{name}_total"] = float(np.nansum(metrics[name]))
+    for name in ("fps", "jank", "cpu", "gpu", "touch_rate", "syscr_s", "syscw_s", "write_bytes_per_syscall",
+                 "disk_await_ms", "disk_queue", "disk_util", "main_runq_ms_s", "render_runq_ms_s", "main_ivcsw_s", "render_ivcsw_s",
+                 "minflt_s", "majflt_s"):
+        values = metrics.get(name)
+        if values is None or np.all(np.isnan(values)):
+            continue
+        p5, p50, p95 = np.nanpercentile(values, [5, 50, 95])
+        summary[name] = {"mean": float(np.nanmean(values)), "p5": float(p5), "p50": float(p50), "p95": float(p95),
+                         "min": float(np.nanmin(values)), "max": float(np.nanmax(values))}
+    if "fps" in metrics:
+        ###FPS分布: 各区间所占时间比例
+        fps_bins = [0, 20, 30, 45, 55, 1000]
+        counts, _ = np.histogram(metrics["fps"][~np.isnan(metrics["fps"])], bins=fps_bins)
+        summary["fps_distribution"] = {f"{low}-{high if high < 1000 else ''}": float(count / max(counts.sum(), 1) * 100)
+                                       for low, high, count in zip(fps_bins, fps_bins[1:], counts)}
+    for name in ("read_kb_s", "write_kb_s", "rchar_kb_s", "wchar_kb_s", "cancelled_write_kb_s"):
+        if name in metrics:
+            values = metrics[name]
+            summary[name] = {"total_mb": float(np.nansum(values * dt) / 1024), "mean": float(np.nanmean(values)),
+                             "peak": float(np.nanmax(values)), "peak_time_s": float(times[np.nanargmax(values)] - times[0])}
+    pss = metrics.get("pss_mb")
+    if pss is not None and np.count_nonzero(~np.isnan(pss)) > 1:
+        valid = ~np.isnan(pss)
+        slope = np.polyfit((times[valid] - times[0]) / 3600, pss[valid], 1)[0]
+        summary["pss_mb"] = {"first": float(pss[valid][0]), "last": float(pss[valid][-1]), "max": float(np.nanmax(pss)),
+                             "growth": float(pss[valid][-1] - pss[valid][0]), "slope_mb_per_hour": float(slope)}
+    for name, hist in session["histograms"].items():
+        summary[f"{name}_ms"] = hist.summary()
+    return summary
+
+def downsample(times, values, max_points=REPORT_MAX_POINTS):
+    """按等长区间降采样, 返回(时间, 均值, 最小值, 最大值)"""
+    if len(values) <= max_points:
+        return times, values, values, values
+    size = math.ceil(len(values) / max_points)
+    pad = size * math.ceil(len(values) / size) - len(values)
+    shape = (-1, size)
+    padded_times = np.concatenate((times, np.full(pad, np.nan))).reshape(shape)
+    padded_values = np.concatenate((values, np.full(pad, np.nan))).reshape(shape)
+    with np.errstate(all='ignore'):
+        return (np.nanmean(padded_times, axis=1), np.nanmean(padded_values, axis=1),
+                np.nanmin(padded_values, axis=1), np.nanmax(padded_values, axis=1))
+
+def render_chart(chart):
+    """在工作进程中用Agg后端绘制一张图, 返回PNG字节"""
+    import io
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    title, ylabel, series, markers = chart
+    figure = Figure(figsize=(10, 2.5), dpi=100)
+    FigureCanvasAgg(figure)
+    plot = figure.add_subplot(111)
+    for label, times, mean, low, high in series:
+        plot.plot(times, mean, linewidth=0.8, label=label)
+        if low is not mean:
+            plot.fill_between(times, low, high, alpha=0.2)
+    for minute, kind in markers:
+        plot.axvline(minute, color=REPORT_MARKER_COLORS.get(kind, 'gray'), linewidth=0.6, alpha=0.6)
+    plot.set_title(title)
+    plot.set_xlabel("time (min)")
+    plot.set_ylabel(ylabel)
+    if len(series) > 1:
+        plot.legend(loc='upper right', fontsize=8)
+    figure.tight_layout()
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+def build_report_html(session_path, summary, charts, events):
+    """生成内嵌图片的独立HTML报告"""
+    rows = []
+    for name, value in summary.items():
+        if isinstance(value, dict):
+            value = ", ".join(f"{key}: {item:.2f}" if isinstance(item, float) else f"{key}: {item}" for key, item in value.items())
+        elif isinstance(value, float):
+            value = f"{value:.1f}"
+        rows.append(f"<tr><th>{html.escape(str(name))}</th><td>{html.escape(str(value))}</td></tr>")
+    images = [f'<h3>{html.escape(title)}</h3><img src="data:image/png;base64,{base64.b64encode(png).decode()}"/>' for title, png in charts]
+    event_rows = [f"<tr><td>{html.escape(time.strftime('%H:%M:%S', time.localtime(event['time'])))}</td><td>{html.escape(event.get('type', ''))}</td>"
+                  f"<td>{html.escape(event.get('message', '') + (' -> ' + event['path'] if 'path' in event else ''))}</td></tr>" for event in events]
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>Monitor report</title>"
+            f"<style>body{{font-family:sans-serif}}table{{border-collapse:collapse}}th,td{{border:1px solid #ccc;padding:4px;text-align:left}}</style>"
+            f"</head><body><h1>Monitor report</h1><p>{html.escape(session_path)}</p>"
+            f"<h2>Summary</h2><table>{''.join(rows)}</table>"
+            f"<h2>Charts</h2>{''.join(images)}"
+            + (f"<h2>Events</h2><table>{''.join(event_rows)}</table>" if event_rows else "")
+            + "</body></html>")
+
+def generate_report(session_path, output_path=None, workers=None):
+    """读取会话记录, 生成HTML报告(同时输出PNG), 图表在进程池中并行绘制"""
+    start = time.perf_counter()
+    session = load_session(session_path)
+    if len(session["time"]) == 0:
+        print(f"No samples in {session_path}")
+        return None
+    summary = summarize_session(session)
+    minutes = (session["time"] - session["time"][0]) / 60
+    ###logcat事件(GC停顿/丢帧/ANR)作为竖线叠加在FPS等图表上
+    markers = [((event["time"] - session["time"][0]) / 60, event["kind"]) for event in session["events"] if event.get("type") == "logcat"]
+    charts = []
+    for file_name, title, ylabel, names in REPORT_CHARTS:
+        series = [(label, *downsample(minutes, session["metrics"][name])) for name, label in names if name in session["metrics"]]
+        charts.append((title, ylabel, series, markers if file_name in REPORT_MARKER_CHARTS else []))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pngs = list(executor.map(render_chart, charts))
+
+    output_path = output_path or os.path.splitext(session_path)[0] + "_report.html"
+    for (file_name, title, _, _), png in zip(REPORT_CHARTS, pngs):
+        with open(f"{os.path.splitext(output_path)[0]}_{file_name}.png", "wb") as png_file:
+            png_file.write(png)
+    with open(output_path, "w", encoding="utf-8") as report_file:
+        report_file.write(build_report_html(session_path, summary, [(chart[0], png) for chart, png in zip(charts, pngs)], session["events"]))
+    print(f"Report saved to {output_path} ({summary['samples']} samples, {time.perf_counter() - start:.2f} s)")
+    return output_path
+
+###日志目录默认为脚本所在目录下的log, 可通过环境变量MONITOR_IO_LOG_DIR指定
+LOG_DIR = os.environ.get("MONITOR_IO_LOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "log"))
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_FLUSH_INTERVAL = 1.0            ###后台写线程每1s批量写入并flush一次
+LOG_MAX_BYTES = 50 * 1024 * 1024    ###单个日志文件超过50MB时轮转
+LOG_ROTATE_INTERVAL = 3600          ###单个日志文件写满1小时时轮转
+LOG_BACKUP_COUNT = 48               ###最多保留的历史日志文件数
+
+log_record_queue = queue.Queue()
+log_writer_stop = threading.Event()
+log_writer_thread = None
+log_to_console = False      ###无界面模式下同时输出到控制台
+session_record_queue = queue.Queue()
+session_path = None         ###会话记录文件(每行一个JSON), 与日志文件同名加_session后缀
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """只把日志记录放入队列, 格式化和写文件都交给后台写线程, 不阻塞采样线程"""
+
+    def prepare(self, record):
+        return record
+
+def rotate_log_file(path, backup_count):
+    """按 xxx.log -> xxx.log.1 -> xxx.log.2 ... 依次重命名, 超出数量的最旧文件被覆盖"""
+    for index in range(backup_count - 1, 0, -1):
+        if os.path.exists(f"{path}.{index}"):
+            os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+    if os.path.exists(path):
+        os.replace(path, f"{path}.1")
+
+def write_log_records(path):
+    """后台写日志线程: 周期性取出所有日志记录, 一次写入一次flush, 按大小或时间轮转"""
+    formatter = logging.Formatter(LOG_FORMAT)
+    log_file = open(path, 'a', encoding='utf-8')
+    opened_at = time.time()
+    while True:
+        stopping = log_writer_stop.wait(LOG_FLUSH_INTERVAL)
+        records = []
+        while not log_record_queue.empty():
+            records.append(log_record_queue.get_nowait())
+        if records:
+            text = ''.join(formatter.format(record) + '\n' for record in records)
+            log_file.write(text)
+            log_file.flush()
+            if log_to_console:
+                sys.stdout.write(text)
+                sys.stdout.flush()
+        write_session_records()
+        if stopping:
+            break
+        if log_file.tell() >= LOG_MAX_BYTES or (log_file.tell() > 0 and time.time() - opened_at >= LOG_ROTATE_INTERVAL):
+            log_file.close()
+            rotate_log_file(path, LOG_BACKUP_COUNT)
+            log_file = open(path, 'a', encoding='utf-8')
+            opened_at = time.time()
+    log_file.close()
+
+def write_session_records():
+    """由后台写日志线程批量追加会话记录"""
+    records = []
+    while not session_record_queue.empty():
+        records.append(session_record_queue.get_nowait())
+    if records and session_path:
+        with open(session_path, 'a', encoding='utf-8') as session_file:
+            session_file.write(''.join(record + '\n' for record in records))
+
+def record_session(record):
+    """记录一条会话数据(sample/event/histogram), 只放入队列, 不在采样线程写文件"""
+    session_record_queue.put(json.dumps(record))
+
+def set_logging(log_dir=LOG_DIR):
     ### 日志
-    logging.basicConfig(
-    level=logging.INFO,  # 设置日志级别为DEBUG，意味着会记录所有级别的日志
-    format='%(asctime)s - %(levelname)s - %(message)s',  # 设置日志输出格式
-    filename=rf'D:\Git-script\monitor_io\log\{current_time}.log',  # 设置日志文件名
-    filemode='a'  # 追加模式（默认是'a'，即追加日志到文件末尾；'w'表示写模式，每次覆盖文件内容）
-)
+    global log_writer_thread, session_path
+    os.makedirs(log_dir, exist_ok=True)
+    session_path = os.path.join(log_dir, f"{current_time}_session.jsonl")
+    logger = logging.getLogger()
+    logger.setLevel(logging.INFO)
+    logger.addHandler(RecordQueueHandler(log_record_queue))
+    log_writer_stop.clear()
+    log_writer_thread = threading.Thread(target=write_log_records, name="log_Thread", args=(os.path.join(log_dir, f"{current_time}.log"),))
+    log_writer_thread.daemon = True
+    log_writer_thread.start()
+
+def stop_logging():
+    """通知后台写线程写完剩余日志后退出"""
+    log_writer_stop.set()
+    if log_writer_thread and log_writer_thread.is_alive():
+        log_writer_thread.join()
 
 if __name__ == "__main__":
     global touchNum # 初始化touchNum
@@ -841,17 +3200,74 @@ if __name__ == "__main__":
     cpu_thread = None
     global gpu_thread
     gpu_thread = None
+    global focus_thread, focus_process, tracked_focus_window, focus_stream_alive
+    global logcat_threads, logcat_processes, logcat_tick
+    logcat_threads = []
+    logcat_processes = {}       ###{流名称: adb logcat进程}
+    logcat_tick = dict.fromkeys(LOGCAT_SAMPLE_KEYS, 0)
+    focus_thread = focus_process = tracked_focus_window = None
+    focus_stream_alive = False
     current_time = time.strftime('%Y-%m-%d %H_%M_%S', time.localtime())
     global prev_timer
     prev_timer = None
     global last_timestamp
     last_timestamp = 0
+    global fps_algorithm, fps_results, fps_algo_y
+    fps_algorithm = "vsync"     ###主FPS算法, 绘图实线及日志FPS使用该算法
+    fps_results = {}
+    fps_algo_y = {}
+    global fps_logcat_marks
+    fps_logcat_marks = []       ###FPS图上每个tick的 (GC停顿ms, 丢帧数, ANR)
+    global frame_stages, frame_bottleneck, janky_percent, max_frame_time, new_frame_count
+    janky_percent = 0.0
+    max_frame_time = 0.0
+    new_frame_count = 0         ###本tick新增的帧数, 为0时界面没有刷新
+    frame_stages = {}
+    frame_bottleneck = None
+    global frame_hist_session, frame_hist_window
+    frame_hist_session = FrameTimeHistogram()
+    frame_hist_window = RollingFrameTimeHistogram(window=60)
+    global touch_latency_hist, pending_touch_events, gesture_latencies
+    touch_latency_hist = FrameTimeHistogram()   ###触摸到出帧延迟, 与帧耗时共用同一套分桶
+    pending_touch_events = []
+    gesture_latencies = {}      ###{手势编号: [延迟ms]}
+    global recent_frames, recent_frame_columns, pending_gestures, scroll_fps, scroll_janky
+    recent_frames = np.empty((0, 0))
+    recent_frame_columns = {}
+    pending_gestures = []
+    scroll_fps = None           ###最近一次滑动手势窗口内的FPS
+    scroll_janky = None
     global prev_meminfo_timer
     prev_meminfo_timer = None
     global last_meminfo_io
     last_meminfo_io = 0
     global memory_io
     memory_io = 0
+    global startup_capture
+    startup_capture = []
+    global anomaly_detectors
+    anomaly_detectors = create_anomaly_detectors()
+    global leak_trends
+    leak_trends = create_leak_trends()
+    global metric_rollups, chart_zoom
+    metric_rollups = {}     ###{指标名: MetricRollup}, 整个运行期间保留
+    chart_zoom = "raw"
+    global pid_start_time, process_restarts
+    pid_start_time = None
+    process_restarts = 0
+    global pss_kb, touch_rate, device_serial, metrics_server
+    pss_kb = touch_rate = 0
+    device_serial = "unknown"
+    metrics_server = None
+    global io_rates
+    io_rates = get_io_rates({}, {}, 1)      ###rchar/wchar/syscr/syscw等速率, 首个tick前全为0
+    global disk_rates
+    disk_rates = get_disk_rates({}, {}, 1)  ###{设备名: IOPS/吞吐量/队列/await/util}, 含合计"total"
+    global sched_rates
+    sched_rates = {}                        ###{"main"/"render": 调度速率}
+    global fault_rates, thread_fault_rates
+    fault_rates = {"minflt_s": 0.0, "majflt_s": 0.0}
+    thread_fault_rates = []                 ###线程级模式下缺页最多的线程
     global fps_x, fps_y, io_x, io_yR, io_yW, cpu_x, cpu_y, gpu_x, gpu_y
     fps_x, fps_y, io_x, io_yR, io_yW, cpu_x, cpu_y, gpu_x, gpu_y= [0], [0], [0], [0], [0], [0], [0], [0], [0]
     global io_yList
@@ -859,6 +3275,48 @@ if __name__ == "__main__":
     global fps_counter, io_counter, cpu_counter, gpu_counter
     fps_counter, io_counter, cpu_counter, gpu_counter = 0, 0, 0, 0
 
+    parser = argparse.ArgumentParser(description="Android IO/FPS/CPU/GPU monitor")
+    parser.add_argument("--headless", action="store_true", help="run without GUI, log to console")
+    parser.add_argument("--package", default='com.gxatek.cockpit.car.settings', help="package name for --headless")
+    parser.add_argument("--event", default='/dev/input/event0', help="getevent input device for --headless")
+    parser.add_argument("--interval", type=float, default=0.5, help="sampling interval in seconds")
+    parser.add_argument("--import-benchmark", action="store_true", help="measure import time and time to first window")
+    parser.add_argument("--deep-capture", action="store_true", help="capture framestats/threads/meminfo/atrace when a trigger fires")
+    parser.add_argument("--system-io", action="store_true", help="sample /proc/*/io of all processes and show the top IO consumers")
+    parser.add_argument("--leak-windows", default=",".join(str(window) for window in LEAK_WINDOWS),
+                        help="comma separated regression windows in seconds for memory leak trends")
+    parser.add_argument("--activity-leak", action="store_true",
+                        help="force a GC and snapshot meminfo each time the first focused window comes back, report Activities/Views that never return to baseline")
+    parser.add_argument("--leak-cycles", type=int, default=ACTIVITY_LEAK_CYCLES, help="round trips before --activity-leak reports")
+    parser.add_argument("--per-thread", action="store_true", help="also sample /proc/<pid>/task/*/stat and report page faults per thread")
+    parser.add_argument("--capture-fps-below", type=parse_capture_trigger, default=DEEP_CAPTURE_TRIGGERS["fps_below"], help="0 or off to disable")
+    parser.add_argument("--capture-frame-time-above", type=parse_capture_trigger, default=DEEP_CAPTURE_TRIGGERS["frame_time_above"], help="ms, 0 or off to disable")
+    parser.add_argument("--capture-io-above", type=parse_capture_trigger, default=DEEP_CAPTURE_TRIGGERS["io_above"], help="kB/s, read + write, 0 or off to disable")
+    parser.add_argument("--report", metavar="SESSION", help="generate an HTML report from a *_session.jsonl recording")
+    parser.add_argument("--output", help="output path of --report")
+    parser.add_argument("--first-window-benchmark", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    first_window_benchmark = args.first_window_benchmark
+    deep_capture_enabled = args.deep_capture
+    set_system_io(args.system_io)
+    per_thread_enabled = args.per_thread
+    activity_leak_enabled = args.activity_leak
+    ACTIVITY_LEAK_CYCLES = args.leak_cycles
+    LEAK_WINDOWS[:] = [int(window) for window in args.leak_windows.split(",") if window.strip()]
+    DEEP_CAPTURE_TRIGGERS.update(fps_below=args.capture_fps_below, frame_time_above=args.capture_frame_time_above, io_above=args.capture_io_above)
+
+    if args.import_benchmark:
+        run_import_benchmark()
+        sys.exit(0)
+    if args.report:
+        generate_report(args.report, args.output)
+        sys.exit(0)
+
     set_logging()
-    open_root()
+    start_metrics_server()
+    if args.headless:
+        run_headless(args.package, args.event, args.interval)
+    else:
+        open_root()
+    stop_logging()
                 
\ No newline at end of file
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import monitor_io
+
+MS = 1000000
+COLUMNS = {"IntendedVsync": 0, "HandleInputStart": 1, "FrameCompleted": 2}
+
+
+def run_touches(frames, touches):
+    monitor_io.pending_touch_events = []
+    monitor_io.gesture_latencies = {}
+    monitor_io.touch_latency_hist = monitor_io.FrameTimeHistogram()
+    for touch in touches:
+        monitor_io.touch_event_queue.put(touch)
+    monitor_io.update_touch_latency(np.array(frames, dtype=float), COLUMNS)
+
+
+def test_late_touch_matches_next_vsync_frame():
+    ###第二个触摸晚于第一帧的vsync(在vsync与输入处理之间), 应匹配到下一帧而不是被丢弃
+    frames = [[100 * MS, 102 * MS, 110 * MS], [116 * MS, 130 * MS, 140 * MS]]
+    run_touches(frames, [(95 * MS, 1), (101 * MS, 1)])
+    assert monitor_io.gesture_latencies[1] == [15.0, 39.0]
+    assert monitor_io.touch_latency_hist.total() == 2
+    assert monitor_io.pending_touch_events == []
+
+
+def test_touch_after_last_vsync_waits_for_next_tick():
+    frames = [[100 * MS, 102 * MS, 110 * MS]]
+    run_touches(frames, [(101 * MS, 1)])
+    assert monitor_io.touch_latency_hist.total() == 0
+    assert monitor_io.pending_touch_events == [(101 * MS, 1)]